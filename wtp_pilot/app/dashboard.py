@@ -3,10 +3,12 @@ import streamlit as st
 import toml
 from PIL import Image
 from pathlib import Path
-import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+
+sys.path.append('wtp_pilot')
+from lib.data.loader import load_flight_index, load_kpi_cube
 ################################################################
 def get_project_root() -> str:
     return str(Path(__file__).parent.parent.parent)
@@ -44,7 +46,6 @@ with st.sidebar.expander("Dataset", expanded=True):
             # format_func=lambda x: config["datasets"][x]["name"],
             help=readme["tooltips"]["toy_dataset"]   
         )
-        df = pd.read_csv(Path(get_project_root()) / "wtp_pilot/inputs/wtp_mock_data4.csv")
 
 
 st.sidebar.title("2. Flight")
@@ -55,14 +56,14 @@ with st.sidebar.expander("Flight", expanded=False):
             ["NZ631"],
             help = readme["tooltips"]["select_flight"],
         )
-    flight_df = df[df["flight_number"] == flight_selected]
+    flights = load_flight_index("wtp_mock_data4.csv")
 
     class_selected = st.selectbox(
             "Flight Class",
             ["Economy", "Business"],
             help = readme["tooltips"]["select_class"],
         )
-    flight_class_df = flight_df[flight_df["class"] == class_selected]
+    flight_class_df = flights.rows(flight_selected, class_selected)
     if class_selected == "Economy":
         txt = ["100", "+80", "+50", "-30", "-20", "wtp"]
         vals_y = [100, 80, +50, -30, -20, 0]
@@ -79,16 +80,17 @@ with st.sidebar.expander("Flight", expanded=False):
 # fig.add_trace(go.Bar(x=flight_class_df["date"], y=flight_class_df['WTP'], name='wtp', marker_color=colors['wtp']))
 # st.plotly_chart(fig)
 ################################################################
-average__seats_per_DCP = flight_class_df.groupby("DCP")["number_of_checkouts"].sum().mean()
-average__wtp_per_DCP = flight_class_df.groupby("DCP")["WTP2"].mean().mean()
+# KPIs from the per flight / class aggregates (lib/data/kpi_cube.py) rather than the raw rows
+kpis = load_kpi_cube("wtp_mock_data4.csv", "flight")
+flight_key = (flight_selected, class_selected)
+average__seats_per_DCP = kpis.sums("DCP", *flight_key)["number_of_checkouts"].mean()
+average__wtp_per_DCP = kpis.means("DCP", "WTP2", *flight_key).mean()
 
-flight_class_df['date'] = pd.to_datetime(flight_class_df['date'])
-average_checkout_rate = flight_class_df[['date', 'checkout_rate']].set_index('date').resample('W').mean()
+average_checkout_rate = kpis.means("week", "checkout_rate", *flight_key, freq="W").to_frame()
 
-revenue_generated = flight_class_df['daily_revenue'].sum()
-wtp_revenue_generated = (flight_class_df['WTP2'] * flight_class_df["number_of_checkouts"]).sum()
-flight_class_df['day_name'] = flight_class_df['date'].dt.day_name()
-weekday_wtp = flight_class_df.groupby('day_name')['WTP2'].mean().reset_index()
+revenue_generated = kpis.total("daily_revenue", *flight_key)
+wtp_revenue_generated = kpis.total("wtp_revenue", *flight_key)
+weekday_wtp = kpis.means("day_name", "WTP2", *flight_key).reset_index()
 ################################################################
 col1, col2, col3, col4 = st.columns(4)
 with col1:
@@ -6,14 +6,14 @@ import sys
 import pandas as pd
 import numpy as np
 import datetime
-import time
-import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import plotly.express as px
 
 # from lib.flight_price_scraping.data_scrape import scrape_data
 
 sys.path.append('wtp_pilot')
+from lib.data.loader import load_dataset, load_flight_index, load_kpi_cube
+from lib.wtp.decomposition import decompose_wtp, tf_components
 st.set_page_config(page_title="Pilot", layout="wide")
 
 def get_project_root() -> str:
@@ -23,53 +23,57 @@ def load_image(image_name: str):
     return Image.open(Path(get_project_root()) / f"wtp_pilot/references/{image_name}")
 
 def load_data(file_name: str):
-    return pd.read_csv(Path(get_project_root()) / f"wtp_pilot/inputs/{file_name}")
+    return load_dataset(file_name)
 
 
-def plot_cumulative_booking_and_fare(day, bookings, fares, speed=0.0001):
-    # Create a Streamlit figure and axis
-    fig, ax = plt.subplots()
-    ax.set_xlabel('Day')
-    ax.set_ylabel('Cumulative Booking')
-    ax.set_title('Booking and Fare')
-    ax.grid(True)
+MAX_ANIMATION_FRAMES = 120
 
-    # Create a secondary y-axis for fare
-    ax2 = ax.twinx()
-    ax2.set_ylabel('Fare', color='red')
-    # ax2.set_label_position('right')
 
-    # Plot cumulative booking on the left y-axis
-    booking_cum_sum = bookings.cumsum()
-    line1, = ax.plot(day, booking_cum_sum, marker='o', color='blue', label='Cumulative Booking')
+def plot_cumulative_booking_and_fare(day, bookings, fares, speed=0.05):
+    ''' Animated booking and fare chart, played back in the browser.
+        Each frame holds the first rows of the two series, as the old matplotlib loop drew them, so
+        days not reached yet are neither drawn nor hoverable, and nothing is re-rendered on the
+        server while it plays. Every frame repeats the rows before it, so long series step a few
+        rows per frame to stay within MAX_ANIMATION_FRAMES. The axis ranges are fixed to the whole
+        series so they don't jump between frames. speed is the seconds per day (row) of playback.
+    '''
+    day = np.asarray(day)
+    if len(day) == 0:
+        st.write("No bookings for this departure date.")
+        return
+    booking_cum_sum = np.asarray(bookings).cumsum()
+    fares = np.round(np.asarray(fares, dtype=float), 2)
+    first_day, last_day = day.min(), day.max()
 
-    # Plot fare on the right y-axis
-    line2, = ax2.plot(day, fares, marker='o', color='red', label='Fare')
+    def series(end):
+        return [go.Scatter(x=day[:end], y=booking_cum_sum[:end]), go.Scatter(x=day[:end], y=fares[:end])]
 
-    # Combine the legends from both axes
-    lines = [line1, line2]
-    ax.legend(lines, [line.get_label() for line in lines])
-    
-    # Create a Streamlit figure placeholder
-    st_figure = st.pyplot(fig)
-
-    # Update the plot dynamically
-    for i in range(len(day)):
-        ax.clear()
-        ax2.clear()
-        line1, = ax.plot(day[:i+1], booking_cum_sum[:i+1], marker='o', color='blue', label='Cumulative Booking')
-        line2, = ax2.plot(day[:i+1], fares[:i+1], marker='o', color='red')
-    
-        ax.set_xlabel('Days')
-        ax.set_ylabel('Cumulative Booking')
-        ax2.set_ylabel('Fare', color='red')
-        ax.set_title('Dynamic Time Series Plot')
-        ax.grid(False)
-        ax2.grid(False)
-        ax.legend(lines, [line.get_label() for line in lines])
-        ax2.legend()
-        st_figure.pyplot(fig)
-        time.sleep(speed)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=day[:1], y=booking_cum_sum[:1], mode='markers+lines', name='Cumulative Booking', line=dict(color='#1f77b4')))
+    fig.add_trace(go.Scatter(x=day[:1], y=fares[:1], mode='lines+markers', name='Fare', line=dict(color='#ff7f0e'), yaxis='y2'))
+    step = -(-len(day) // MAX_ANIMATION_FRAMES)
+    ends = list(range(1, len(day), step)) + [len(day)]
+    fig.frames = [go.Frame(name=str(end), data=series(end), traces=[0, 1]) for end in ends]
+
+    play = dict(frame=dict(duration=max(int(speed * step * 1000), 1), redraw=False), transition=dict(duration=0),
+                fromcurrent=True, mode='immediate')
+    pause = dict(frame=dict(duration=0, redraw=False), transition=dict(duration=0), mode='immediate')
+    fig.update_layout(
+        title='Booking and Fare',
+        xaxis=dict(title='Days', range=[first_day - 0.5, last_day + 0.5]),
+        yaxis=dict(title='Cumulative Booking', range=[0, max(booking_cum_sum.max(), 1) * 1.05]),
+        yaxis2=dict(title='Fare', overlaying='y', side='right', showgrid=False, range=[fares.min() * 0.95, fares.max() * 1.05]),
+        legend=dict(yanchor='top', y=0.99, xanchor='left', x=0.01),
+        updatemenus=[dict(type='buttons', direction='left', x=0, y=-0.2, xanchor='left', yanchor='top', showactive=False,
+                          buttons=[dict(label='Play', method='animate', args=[None, play]),
+                                   dict(label='Pause', method='animate', args=[[None], pause])])],
+        sliders=[dict(x=0.15, y=-0.2, len=0.85, yanchor='top', currentvalue=dict(prefix='Day '),
+                      steps=[dict(label=str(day[end - 1]), method='animate', args=[[str(end)], pause]) for end in ends])],
+        height=450,
+        width=600
+    )
+
+    st.plotly_chart(fig)
 
 def plot_no_annimation(day, bookings, fares):
     # Create a Streamlit figure placeholder
@@ -143,17 +147,6 @@ def create_stacked_bar_chart(tf_wtp_dtd_fare):
      # Render the Plotly figure using Streamlit
     st.plotly_chart(fig)
 
-# Dictionary to add values based on keys
-my_dict = {0: 50, 1: 70, 2: 90, 3: 100, 4:120, 5: 150, 6: 170, 7: 190, 8: 190, 9:200}
-# Function to add values from the dictionary to 'WTP' based on 'TF'
-def add_values(row):
-    tf_value = row['TF']
-    if tf_value in my_dict:
-        return row['fare'] + my_dict[tf_value]
-    else:
-        return row['fare']
-
-
 def main():
     # Set the page title
     st.title("Flight Information")
@@ -189,6 +182,9 @@ def main():
         # Add an input for number of seats available
         seats_available = int(st.sidebar.text_input("Number of Seats Available", "100"))
 
+        # Playback speed of the booking and fare animation
+        playback_speed = st.slider("Playback Speed (days per second)", 1, 100, 20)
+
         # Add a checkbox for special event
         is_special_event = st.checkbox("Special Event on Departure Date")
 
@@ -199,32 +195,14 @@ def main():
             special_event_importance = st.slider("Importance of the Special Event (1-10)", 1, 10)
 
         # Read data from the CSV file in the input folder
-        simulated_flight_data = load_data("booking_730_flights_36_2024_2025.csv")
-        # Filter the data based on the selected departure date
-        filtered_flight_data = simulated_flight_data[simulated_flight_data["departure_date"] == str(departure_date)]
-        filtered_flight_data['simulation_day'] = 365 - filtered_flight_data['days_to_departure']
-        filtered_flight_data['WTP2'] = filtered_flight_data['WTP']
-        filtered_flight_data['WTP2'] += filtered_flight_data.groupby('TF').cumcount()
-        filtered_flight_data['wtp_dtd'] = filtered_flight_data.groupby('TF')['fare'].transform(lambda x: x * np.random.uniform(0.7, 0.75))
-        
-        filtered_flight_data['revenue'] = filtered_flight_data['booking'] * filtered_flight_data['fare']
-        
-        ff = filtered_flight_data.groupby('TF')['wtp_dtd'].mean().reset_index()
-        gg = filtered_flight_data.groupby('TF')['fare'].mean().reset_index()
-        tf_wtp_dtd_fare = pd.merge(ff, gg, on='TF') 
-        tf_wtp_dtd_fare['diff'] = tf_wtp_dtd_fare['fare'] - tf_wtp_dtd_fare['wtp_dtd']
-        tf_wtp_dtd_fare['woy'] = np.round(tf_wtp_dtd_fare['diff'] * 0.8, 2)
-        tf_wtp_dtd_fare['dow'] = np.round(tf_wtp_dtd_fare['diff'] * 0.2, 2)
-        # WTP_WOY = load_data("WTP_WOY.csv")
-        # filtered_flight_data = pd.merge(filtered_flight_data, WTP_WOY, left_on='woy_departure', right_on='WOY')
-        # DOW_WTP={1: 40, 2: 20, 3: 20, 4: 20, 5: 45, 6: 70, 7: 50}
-        # filtered_flight_data['DOW_WTP'] = filtered_flight_data['dow_departure'].map(DOW_WTP)
-        # filtered_flight_data['final_wtp'] = filtered_flight_data['DOW_WTP'] + filtered_flight_data['wtp_dtd'] + filtered_flight_data['WOY_WTP']
-        # filtered_flight_data['final_fare'] = filtered_flight_data['final_wtp'] + filtered_flight_data['bid_price']
-        # # Apply the function to the DataFrame
-        # filtered_flight_data['fare'] = filtered_flight_data.apply(add_values, axis=1)
+        simulated_flight_data = load_flight_index("booking_730_flights_36_2024_2025.csv", keys=["departure_date"])
+        # Rows of the selected departure date
+        # WTP components (DTD, WOY, DOW, final WTP and fare), reproducible for a given seed
+        filtered_flight_data = decompose_wtp(simulated_flight_data.rows(departure_date), load_data("WTP_WOY.csv"), seed=0)
+        tf_wtp_dtd_fare = tf_components(filtered_flight_data)
    
-        mock_data = load_data("wtp_mock_data.csv")
+        booking_kpis = load_kpi_cube("booking_730_flights_36_2024_2025.csv", "booking")
+        daily_kpis = load_kpi_cube("wtp_mock_data.csv", "daily")
     if False:
         st.write(f"Departure Airport: {departure_airport}")
         st.write(f"Arrival Airport: {arrival_airport}")
@@ -244,17 +222,15 @@ def main():
     # st.dataframe(filtered_flight_data)
 
     ################################################################
-    average__seats_per_DCP = mock_data.groupby("DCP")["number_of_checkouts"].sum().mean()
-    average__seats_per_DCP = filtered_flight_data.groupby("TF")["booking"].sum().mean()
-    average__wtp_per_DCP = filtered_flight_data.groupby("TF")["WTP"].mean().mean()
+    # KPIs from the pre-aggregated cubes (lib/data/kpi_cube.py) rather than the raw rows
+    average__seats_per_DCP = booking_kpis.sums("TF", departure_date)["booking"].mean()
+    average__wtp_per_DCP = booking_kpis.means("TF", "WTP", departure_date).mean()
 
-    mock_data['date'] = pd.to_datetime(mock_data['date'])
-    average_checkout_rate = mock_data[['date', 'checkout_rate']].set_index('date').resample('W').mean()
+    average_checkout_rate = daily_kpis.means("week", "checkout_rate", freq="W").to_frame()
 
-    revenue_generated = filtered_flight_data['revenue'].sum()
+    revenue_generated = booking_kpis.total("revenue", departure_date)
 
-    mock_data['day_name'] = mock_data['date'].dt.day_name()
-    weekday_wtp = mock_data.groupby('day_name')['WTP'].mean().reset_index()
+    weekday_wtp = daily_kpis.means("day_name", "WTP").reset_index()
     # ################################################################
     # col1, col2, col3, col4 = st.columns(4)
     # with col1:
@@ -321,7 +297,8 @@ def main():
 
     # col1, col2 = st.columns(2)
     # with col1:
-    plot_cumulative_booking_and_fare(filtered_flight_data['simulation_day'], filtered_flight_data['booking'], filtered_flight_data['fare'])
+    plot_cumulative_booking_and_fare(filtered_flight_data['simulation_day'], filtered_flight_data['booking'], filtered_flight_data['fare'],
+                                     speed=1 / playback_speed)
 
     # with col2:
     #     create_stacked_bar_chart(tf_wtp_dtd_fare)
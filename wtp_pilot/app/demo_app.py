@@ -1,3 +1,4 @@
+import sys
 import streamlit as st
 import toml
 from PIL import Image
@@ -7,6 +8,9 @@ import numpy as np
 import plotly.graph_objects as go
 # import plotly.express as px
 from datetime import datetime, timedelta
+
+sys.path.append('wtp_pilot')
+from lib.data.loader import load_dataset
 ################################################################
 def get_project_root() -> str:
     return str(Path(__file__).parent.parent.parent)
@@ -32,7 +36,7 @@ st.write("")
 st.sidebar.image(load_image("logo.jpg"), use_column_width=True)
 ################################################################
 # Load data
-df = pd.read_csv(Path(get_project_root()) / "wtp_pilot/inputs/wtp_mock_data4.csv")
+df = load_dataset("wtp_mock_data4.csv")
 ################################################################
 # Sample data: Mapping of flight numbers to a list of departure times
 flight_departure_times = {
@@ -5,7 +5,7 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import datetime as dt
 import os
-from amadeus import Client, ResponseError
+import requests
 from dotenv import load_dotenv
 import sys
 import pandas as pd
@@ -20,6 +20,10 @@ sys.path.append('/Users/hanih/Documents/Projects/wtp_pilot/wtp_pilot/lib/bid_pri
 from flight_utils import *
 from demand_rate import *
 from bid_price import *
+sys.path.append('wtp_pilot')
+from lib.flight_offers.client import FlightOffersClient, get_flights_info
+from lib.flight_offers.parsing import parse_flight_details
+from lib.flight_offers.similarity import find_top_n_similar_flights
 
 # Load environment variables from .env file
 load_dotenv()
@@ -110,7 +114,7 @@ def generate_price_changes(bid_price, recommended_fare, n, increment=25):
 st.set_page_config(page_title="Pilot", layout="wide")
 # Main function where we design our Streamlit app
 def main():
-    amadeus = Client(
+    amadeus = FlightOffersClient(
         client_id=os.getenv('AMADEUS_CLIENT_ID'),
         client_secret=os.getenv('AMADEUS_CLIENT_SECRET')
     )
@@ -381,7 +385,7 @@ def main():
                     )
                 else:
                     st.sidebar.write("No flights found for the selected criteria.")
-            except ResponseError as e:
+            except requests.RequestException as e:
                 st.error('Failed to fetch flight information. Please try again later.')
 
             target_flight = NZ_flights_for_DepartureDay[NZ_flights_for_DepartureDay['DepartureTime'] == selected_time].iloc[0]
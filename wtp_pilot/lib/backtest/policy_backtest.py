@@ -0,0 +1,242 @@
+''' Back-test pricing policies against the booking files in wtp_pilot/inputs.
+
+    A job is one (file, flight, class, departure date, policy). Jobs are fanned out over a process
+    pool; each worker reads an input file once and keeps its partitions in memory. Every finished
+    job is appended to a JSON-lines results file straight away, so an interrupted run can be resumed
+    by running it again with the same results file.
+
+    Policies are compared on a demand-response model calibrated to the file: each day's visitors
+    buy at the observed checkout rate when offered the observed fare, and at that rate scaled by a
+    logistic purchase curve in price / WTP (lib.bid_price.curves.logistic_wtp) at any other fare.
+    The fixed fare policy therefore reproduces the recorded bookings and revenue.
+'''
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from lib.bid_price.bid_price_generator import BidCalculator
+from lib.bid_price.cache import BidPriceCache
+from lib.bid_price.curves import demand_curve_from_tfs, logistic_wtp
+from lib.bid_price.session import BidPriceSession
+
+INPUTS_DIR = Path(__file__).parent.parent.parent / 'inputs'
+DEFAULT_FILES = ['wtp_mock_data.csv', 'wtp_mock_data2.csv', 'wtp_mock_data3.csv', 'wtp_mock_data4.csv']
+PARTITION_COLUMNS = ['flight_number', 'class', 'departure_date']
+CABIN_CAPACITIES = {'Economy': 180, 'Business': 30, 'First Class': 10}
+# Width of the logistic purchase curve, as a share of WTP
+PRICE_RESPONSE_SCALE = 0.1
+NUM_TFS = 10
+DAYS_IN_YEAR = 365
+
+
+def _wtp(partition):
+    return partition['WTP2' if 'WTP2' in partition else 'WTP'].to_numpy(dtype=float)
+
+
+def _days_to_departure(partition):
+    return (pd.to_datetime(partition['departure_date']) - pd.to_datetime(partition['date'])).dt.days.to_numpy()
+
+
+def price_response(prices, wtp, scale=PRICE_RESPONSE_SCALE):
+    ''' Share of visitors buying at prices, falling along a logistic curve centred on their WTP. '''
+    return logistic_wtp(wtp, scale * wtp)(np.asarray(prices, dtype=float), None)
+
+
+def expected_demand(partition, fares):
+    ''' Expected buyers on each day of a partition when offered fares: the observed checkouts at
+        the observed fare, scaled by the price response relative to it, and never more than the
+        day's visitors.
+    '''
+    visits = partition['website_visit'].to_numpy(dtype=float)
+    checkouts = partition['number_of_checkouts'].to_numpy(dtype=float)
+    observed = partition['air_fare_usd'].to_numpy(dtype=float)
+    wtp = _wtp(partition)
+    return np.minimum(visits, checkouts * price_response(fares, wtp) / price_response(observed, wtp))
+
+
+def fixed_fare_policy(partition, capacity):
+    ''' The published fare, as booked. '''
+    return partition['air_fare_usd'].to_numpy(dtype=float)
+
+
+def wtp_adjusted_policy(partition, capacity):
+    ''' The WTP shown as the total of the dashboard waterfall. '''
+    return _wtp(partition)
+
+
+@lru_cache(maxsize=None)
+def _bid_price_cache():
+    ''' One BidPriceCache per worker process. '''
+    return BidPriceCache()
+
+
+def demand_rates_per_tf(partition, num_tfs=NUM_TFS, days_in_year=DAYS_IN_YEAR):
+    ''' Observed bookings per TF in the generate_demand_rates layout ({'TF0': ..., 'TF9': ...}),
+        for demand_curve_from_tfs. TFs the partition has no days in get its overall daily mean.
+    '''
+    days_in_tf = days_in_year / num_tfs
+    tf = np.clip((num_tfs - _days_to_departure(partition) / days_in_tf).astype(int), 0, num_tfs - 1)
+    daily = pd.Series(partition['number_of_checkouts'].to_numpy(dtype=float)).groupby(tf).mean()
+    daily = daily.reindex(range(num_tfs), fill_value=daily.mean())
+    return {f'TF{i}': rate * days_in_tf for i, rate in daily.items()}
+
+
+def bid_price_policy(partition, capacity):
+    ''' The published fare, raised to the BidCalculator bid price for the seats left that day.
+
+        The DP's arrival probability per day comes from the observed bookings per TF
+        (demand_curve_from_tfs), and its purchase probability from the same price response the
+        replay uses, relative to the average published fare. The seats left follow the expected
+        bookings at the fares offered. Solved value tables come from the shared BidPriceCache, so
+        re-running a back-test (or another policy set) over the same partitions doesn't solve again.
+    '''
+    fares = partition['air_fare_usd'].to_numpy(dtype=float)
+    dtd = _days_to_departure(partition)
+    horizon = int(dtd.max())
+    reference_fare = fares.mean()
+    reference_wtp = _wtp(partition).mean()
+
+    def wtp_curve(prices, days):
+        return np.minimum(1, price_response(prices, reference_wtp) / price_response(reference_fare, reference_wtp))
+
+    departure_date = partition['departure_date'].iloc[0]
+    calculator = BidCalculator(
+        (int(fares.min() * 0.8), int(fares.max() * 1.2)),
+        demand_curve=demand_curve_from_tfs(demand_rates_per_tf(partition), departure_date, horizon,
+                                           num_tfs=NUM_TFS, days_in_year=DAYS_IN_YEAR),
+        wtp_curve=wtp_curve,
+        cache=_bid_price_cache(),
+    )
+    session = BidPriceSession(calculator, capacity, horizon)
+
+    # expected_demand one day at a time, on arrays pulled out of the partition once
+    visits = partition['website_visit'].to_numpy(dtype=float)
+    checkouts = partition['number_of_checkouts'].to_numpy(dtype=float)
+    wtp = _wtp(partition)
+    observed_response = price_response(fares, wtp)
+
+    offered = np.empty(len(partition))
+    for day, (fare, days_left) in enumerate(zip(fares, dtd)):
+        session.advance_day(session.dtd - days_left)
+        offered[day] = max(fare, session.bid_price) if session.seats else fare
+        demand = checkouts[day] * price_response(offered[day], wtp[day]) / observed_response[day]
+        booked = int(np.rint(min(visits[day], demand)))
+        session.record_booking(min(booked, session.seats))
+    return offered
+
+
+POLICIES = {
+    'fixed_fare': fixed_fare_policy,
+    'bid_price': bid_price_policy,
+    'wtp_adjusted': wtp_adjusted_policy,
+}
+
+
+@lru_cache(maxsize=None)
+def _load_partitions(path):
+    ''' All partitions of one input file, loaded once per worker process. '''
+    df = pd.read_csv(path)
+    return {key: group.sort_values('date') for key, group in df.groupby(PARTITION_COLUMNS)}
+
+
+def _job_key(job):
+    return '|'.join(str(part) for part in job)
+
+
+def replay(partition, fares, capacity):
+    ''' Replay a fare path against the demand-response model: each day sells its expected_demand
+        at the fare offered, until the cabin is full. Bookings and spill are expected values.
+    '''
+    buys = expected_demand(partition, fares)
+    sold = np.diff(np.minimum(np.cumsum(buys), capacity), prepend=0)
+    bookings = float(sold.sum())
+    revenue = float((sold * fares).sum())
+    return {
+        'revenue': revenue,
+        'bookings': bookings,
+        'load_factor': bookings / capacity,
+        'spill': float(buys.sum() - bookings),
+        'average_fare': revenue / bookings if bookings else 0.0,
+    }
+
+
+def run_job(job):
+    path, flight_number, cabin, departure_date, policy = job
+    partition = _load_partitions(path)[(flight_number, cabin, departure_date)]
+    capacity = CABIN_CAPACITIES.get(cabin, 180)
+    fares = POLICIES[policy](partition, capacity)
+    metrics = replay(partition, fares, capacity)
+    return dict(file=Path(path).name, flight_number=flight_number, cabin=cabin,
+                departure_date=departure_date, policy=policy, **metrics)
+
+
+def list_jobs(files, policies):
+    jobs = []
+    for file_name in files:
+        path = str(INPUTS_DIR / file_name)
+        keys = pd.read_csv(path, usecols=PARTITION_COLUMNS).drop_duplicates()
+        for flight_number, cabin, departure_date in keys.itertuples(index=False):
+            jobs += [(path, flight_number, cabin, departure_date, policy) for policy in policies]
+    return jobs
+
+
+def _finished_jobs(results_path):
+    ''' Job keys already in the results file. Lines that don't parse or have no job (the half-written
+        last line of an interrupted run) are dropped from the file, so the rerun appends after whole
+        lines and the file still reads as JSON lines.
+    '''
+    if not results_path.exists():
+        return set()
+    done = set()
+    kept = []
+    with open(results_path) as f:
+        lines = f.read().splitlines()
+    for line in lines:
+        try:
+            done.add(json.loads(line)['job'])
+            kept.append(line)
+        except (ValueError, TypeError, KeyError):
+            continue
+    if len(kept) != len(lines):
+        print(f'Dropping {len(lines) - len(kept)} unreadable lines from {results_path}')
+        tmp = results_path.with_name(results_path.name + '.tmp')
+        tmp.write_text(''.join(line + '\n' for line in kept))
+        tmp.replace(results_path)
+    return done
+
+
+def run_backtest(results_path='backtest_results.jsonl', files=DEFAULT_FILES, policies=tuple(POLICIES), processes=None):
+    ''' Run every (file, flight, class, departure date, policy) job not already in results_path.
+        Returns all results in the file as a DataFrame.
+    '''
+    results_path = Path(results_path)
+    done = _finished_jobs(results_path)
+
+    pending = [job for job in list_jobs(files, policies) if _job_key(job) not in done]
+    print(f'{len(pending)} jobs to run, {len(done)} already done')
+
+    start = time.perf_counter()
+    flights = set()
+    with ProcessPoolExecutor(processes) as pool, open(results_path, 'a') as out:
+        futures = {pool.submit(run_job, job): job for job in pending}
+        for future in as_completed(futures):
+            job = futures[future]
+            out.write(json.dumps({'job': _job_key(job), **future.result()}) + '\n')
+            out.flush()
+            flights.add(job[:4])
+    elapsed = time.perf_counter() - start
+    if pending:
+        print(f'{len(flights)} flights, {len(pending)} jobs in {elapsed:.2f}s '
+              f'({len(flights) / elapsed:.1f} flights/s)')
+
+    return pd.read_json(results_path, lines=True)
+
+
+if __name__ == '__main__':
+    results = run_backtest()
+    print(results.pivot_table(index=['file', 'flight_number', 'cabin'], columns='policy', values='revenue'))
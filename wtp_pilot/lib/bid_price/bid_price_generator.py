@@ -1,10 +1,56 @@
 import random
 import pandas as pd
+import numpy as np
 import math
 
+# Bump whenever solve_value_tables changes what it computes, so cached tables of the old DP are dropped
+SOLVER_VERSION = 1
+
+
+def solve_value_tables(C, T, prices, probability_purchase):
+    ''' Fill V(x, t) bottom-up for one or many same-shaped problems at once.
+        probability_purchase has shape (..., T+1, n_prices): row t is used when filling V(., t).
+        Any leading axes are solved together. Returns an array of shape (..., C+1, T+1).
+    '''
+    probability_purchase = np.asarray(probability_purchase, dtype=float)
+    batch_shape = probability_purchase.shape[:-2]
+
+    values = np.zeros(batch_shape + (C + 1, T + 1)) # V(0, t) = V(x, 0) = 0
+    # Work buffers are reused across time steps; the arithmetic is the same as in V
+    term1 = np.empty(batch_shape + (C, len(prices)))
+    term2 = np.empty_like(term1)
+    for t in range(1, T + 1):
+        probability_t = probability_purchase[..., t, None, :]
+        np.add(prices, values[..., :-1, t - 1, None], out=term1) # p + V(x - 1, t - 1) for x = 1..C
+        term1 *= probability_t
+        np.multiply(1 - probability_t, values[..., 1:, t - 1, None], out=term2) # V(x, t - 1) for x = 1..C
+        term1 += term2
+        term1.max(axis=-1, out=values[..., 1:, t])
+    return values
+
+
+def bid_prices_from_values(values):
+    ''' b_star for a whole value table: entry [..., s, t] is V(s, t - 1) - V(s - 1, t - 1).
+    '''
+    bids = np.zeros_like(values)
+    bids[..., 1:, 1:] = values[..., 1:, :-1] - values[..., :-1, :-1]
+    return bids
+
+
 class BidCalculator:
-    def __init__(self, price_range):
+    def __init__(self, price_range, demand_curve=None, wtp_curve=None, cache=None):
+        ''' demand_curve: arrival rate per period indexed by days to departure (array of length >= T+1,
+                          a scalar, or a vectorized function of the DTD array). Defaults to arrival_rate.
+            wtp_curve: purchase probability per price in range(*price_range) (array, or array of shape
+                       (T+1, n_prices) for a DTD-dependent curve, or a vectorized function of
+                       (prices, dtd) such as the ones in lib.bid_price.curves). Defaults to WTP.
+            cache: optional lib.bid_price.cache.BidPriceCache; solved value tables are stored there
+                   and reused whenever the same inputs are solved again.
+        '''
         self.price_range = price_range
+        self.demand_curve = demand_curve
+        self.wtp_curve = wtp_curve
+        self.cache = cache
 
     def V(self, x, t, delta_t, D_lambda, memo):
         price_min, price_max = self.price_range
@@ -49,15 +95,71 @@ class BidCalculator:
         '''Let's imagine for now WTP=1'''
         return 1
     
-    def calculate_bid_prices(self, C, T):
+    def arrival_rates(self, T):
+        ''' Arrival rate for t = 0..T as a lookup array.
+        '''
+        if self.demand_curve is None:
+            rates = self.arrival_rate(T) # one rate for the whole horizon, as in find_Vs
+        elif callable(self.demand_curve):
+            rates = self.demand_curve(np.arange(T + 1))
+        else:
+            rates = self.demand_curve
+        rates = np.asarray(rates, dtype=float)
+        if rates.ndim:
+            if len(rates) < T + 1:
+                raise ValueError(f'demand_curve has {len(rates)} values, need one per DTD 0..{T}')
+            rates = rates[:T + 1]
+        return np.broadcast_to(rates, (T + 1,))
+
+    def wtp_table(self, T):
+        ''' Willingness-to-pay probability for every (t, price) as a (T+1, n_prices) lookup array.
+        '''
+        price_min, price_max = self.price_range
+        if self.wtp_curve is None:
+            wtp = [self.WTP(p) for p in range(price_min, price_max)]
+        elif callable(self.wtp_curve):
+            wtp = self.wtp_curve(np.arange(price_min, price_max, dtype=float), np.arange(T + 1)[:, None])
+        else:
+            wtp = self.wtp_curve
+        wtp = np.asarray(wtp, dtype=float)
+        if wtp.ndim == 2:
+            wtp = wtp[:T + 1]
+        return np.broadcast_to(wtp, (T + 1, price_max - price_min))
+
+    def purchase_probability(self, T):
+        ''' Probability of a sale in one period for every (t, price), shape (T+1, n_prices).
+            Demand and WTP are evaluated once into arrays rather than once per (x, t, p).
+        '''
         delta_t = 1 # IMPORTANT: For the sake of simulation we set the dt such that the probability of 2 arrivals are negligible
-    
-        values, D_lambda = self.find_Vs(C, T, delta_t, memo={})
+        return np.minimum(1, self.arrival_rates(T)[:, None] * delta_t * self.wtp_table(T))
+
+    def value_table(self, C, T):
+        ''' Bottom-up version of V: fills V(x, t) one time step at a time.
+            Returns a (C+1) x (T+1) array where entry [x, t] equals V(x, t, ...) of the recursive solver.
+        '''
+        prices = np.arange(*self.price_range, dtype=float)
+        probability_purchase = self.purchase_probability(T)
+        if self.cache is None:
+            return solve_value_tables(C, T, prices, probability_purchase)
+
+        key = self.cache.key(C, T, prices, probability_purchase)
+        values = self.cache.get(key)
+        if values is None:
+            values = solve_value_tables(C, T, prices, probability_purchase)
+            self.cache.put(key, values)
+        return values
+
+    def bid_price_table(self, C, T):
+        ''' Array version of b_star: entry [s, t] is the bid price with s seats left and t periods to go.
+        '''
+        return bid_prices_from_values(self.value_table(C, T))
+
+    def calculate_bid_prices(self, C, T):
+        bids = self.bid_price_table(C, T).tolist()
         res = {}
         for s in range(1, C+1):
             for t in range(1, T+1):
-                optimal_bids = self.b_star(s, t, delta_t, D_lambda, values)
-                res[(s, t)] = optimal_bids
+                res[(s, t)] = bids[s][t]
         return res
 
 
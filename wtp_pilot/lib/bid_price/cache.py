@@ -0,0 +1,77 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from lib.bid_price.bid_price_generator import SOLVER_VERSION
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'wtp_pilot' / 'bid_prices'
+
+
+class BidPriceCache:
+    ''' Content-addressed on-disk cache of solved value tables.
+
+        Entries are .npy files named after the solver version and a hash of everything the solve
+        depends on (capacity, horizon, price grid and the purchase probability table, which already
+        folds in the demand and WTP inputs). Hits are memory-mapped, so repeated views and app restarts
+        do not re-solve or copy the table. Entries of other solver versions are deleted on open, and
+        the least recently used entries are evicted once the directory grows past max_bytes.
+    '''
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=512 * 1024 ** 2, solver_version=SOLVER_VERSION):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.solver_version = solver_version
+        for path in self.directory.glob('*.npy'):
+            if not path.name.startswith(f'v{solver_version}-'):
+                path.unlink(missing_ok=True)
+
+    def key(self, C, T, prices, probability_purchase):
+        digest = hashlib.sha256()
+        digest.update(f'{C}:{T}'.encode())
+        for array in (prices, probability_purchase):
+            array = np.ascontiguousarray(array, dtype=float)
+            digest.update(str(array.shape).encode())
+            digest.update(array.tobytes())
+        return f'v{self.solver_version}-{digest.hexdigest()}'
+
+    def path(self, key):
+        return self.directory / f'{key}.npy'
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            values = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(path) # mark as recently used
+        return values
+
+    def put(self, key, values):
+        # Write to a temporary file first so readers never see a partial table
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp, self.path(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for path in self.directory.glob('*.npy'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for path in self.directory.glob('*.npy'):
+            path.unlink(missing_ok=True)
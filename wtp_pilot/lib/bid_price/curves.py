@@ -0,0 +1,58 @@
+''' Vectorized demand and WTP curves for BidCalculator(demand_curve=..., wtp_curve=...).
+
+    Demand curves return an arrival rate per period for an array of days to departure.
+    WTP curves take (prices, dtd) arrays and broadcast to a (T+1, n_prices) table.
+'''
+import numpy as np
+import pandas as pd
+
+DEPARTURE_DAY_OF_WEEK_MODIFIER = {
+    'Monday': 1.0,
+    'Tuesday': 0.9,
+    'Wednesday': 0.95,
+    'Thursday': 1.05,
+    'Friday': 1.1,
+    'Saturday': 0.85,
+    'Sunday': 1.0
+}
+
+
+def demand_curve_from_tfs(demand_rate_per_tf_day, departure_date, horizon, num_tfs=10, days_in_year=365):
+    ''' Arrival rate for every DTD 0..horizon from one day of generate_demand_rates output
+        ({'TF0': mean bookings, ..., 'TF9': ...}), adjusted for the departure day of week.
+        Same formula as the notebook arrival_rate: 1 - exp(-mean / days_in_tf * dow_modifier).
+    '''
+    days_in_tf = days_in_year / num_tfs
+    mean_arrival = np.array([demand_rate_per_tf_day[f'TF{tf}'] for tf in range(num_tfs)], dtype=float)
+    dtd = np.arange(horizon + 1)
+    tf = np.clip((num_tfs - dtd / days_in_tf).astype(int), 0, num_tfs - 1)
+    modifier = DEPARTURE_DAY_OF_WEEK_MODIFIER[pd.Timestamp(departure_date).day_name()]
+    return 1 - np.exp(-mean_arrival[tf] / days_in_tf * modifier)
+
+
+def logistic_wtp(reference_price, scale):
+    ''' Probability of buying falls along a logistic curve centred on reference_price.
+    '''
+    def curve(prices, dtd):
+        return 1 / (1 + np.exp((prices - reference_price) / scale))
+    return curve
+
+
+def exponential_wtp(reference_price, elasticity):
+    ''' Everyone buys up to reference_price, then demand decays exponentially with the relative markup.
+    '''
+    def curve(prices, dtd):
+        markup = np.maximum(prices - reference_price, 0) / reference_price
+        return np.exp(-elasticity * markup)
+    return curve
+
+
+def log_wtp(base_price, alpha=0.2, beta=0.05, days_in_tf=36.5, num_tfs=10):
+    ''' Vectorized notebook wtp_probability: a log price factor scaled by a factor that grows
+        as departure approaches, capped at 1, and 1 at or below base_price.
+    '''
+    def curve(prices, dtd):
+        price_factor = 1 / (1 + alpha * np.log1p(np.maximum(prices - base_price, 0)))
+        days_factor = 1 + beta * (num_tfs - dtd / days_in_tf)
+        return np.where(prices <= base_price, 1.0, np.minimum(1, price_factor * days_factor))
+    return curve
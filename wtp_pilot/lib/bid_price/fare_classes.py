@@ -0,0 +1,100 @@
+''' Nested fare-class seat protection for a single cabin.
+
+    Fares are ordered from the highest class to the lowest. Protection level j is the number of seats
+    held back for classes 1..j (the lowest-index, highest-fare classes); booking limit j is the number
+    of seats class j may sell, nested: b_1 = C and b_j = C - y_{j-1}.
+    Demand for the EMSR heuristics is normal (mean, std); the exact DP uses Poisson demand and the
+    usual low-before-high arrival order.
+'''
+from statistics import NormalDist
+
+import numpy as np
+
+FARE_PRODUCTS = ["First Class", "Business Flex", "Business Standard", "Premium Economy",
+                 "Economy Flex", "Economy Standard", "Economy Basic"]
+
+_inv_cdf = np.vectorize(NormalDist().inv_cdf, otypes=[float])
+
+
+def _normal_quantile(probability):
+    return _inv_cdf(np.clip(probability, 1e-12, 1 - 1e-12))
+
+
+def emsr_a(fares, means, stds, capacity=None):
+    ''' EMSR-a protection levels y_1..y_{n-1}: sum over k <= j of the Littlewood protection
+        of class k against class j+1, mean_k + std_k * z(1 - fare_{j+1} / fare_k).
+    '''
+    fares, means, stds = (np.asarray(a, dtype=float) for a in (fares, means, stds))
+    ratio = fares[None, 1:] / fares[:, None] # [k, j] = fare_{j+1} / fare_k
+    pairwise = means[:, None] + stds[:, None] * _normal_quantile(1 - ratio)
+    pairwise = np.triu(np.maximum(pairwise, 0)) # only classes k <= j are protected against class j+1
+    protection = pairwise.sum(axis=0)
+    return np.clip(protection, 0, capacity) if capacity is not None else protection
+
+
+def emsr_b(fares, means, stds, capacity=None):
+    ''' EMSR-b protection levels y_1..y_{n-1}: classes 1..j are pooled into one class with the
+        demand-weighted average fare and aggregated normal demand, protected against fare_{j+1}.
+    '''
+    fares, means, stds = (np.asarray(a, dtype=float) for a in (fares, means, stds))
+    pooled_mean = np.cumsum(means)[:-1]
+    pooled_std = np.sqrt(np.cumsum(stds ** 2))[:-1]
+    pooled_fare = np.cumsum(fares * means)[:-1] / np.maximum(pooled_mean, 1e-12)
+    protection = np.maximum(pooled_mean + pooled_std * _normal_quantile(1 - fares[1:] / pooled_fare), 0)
+    return np.clip(protection, 0, capacity) if capacity is not None else protection
+
+
+def booking_limits(protection_levels, capacity):
+    ''' Nested booking limits from protection levels: b_1 = C, b_j = max(C - y_{j-1}, 0).
+    '''
+    protection_levels = np.asarray(protection_levels, dtype=float)
+    return np.concatenate([[capacity], np.maximum(capacity - protection_levels, 0)])
+
+
+def _poisson_pmf(mean, max_demand):
+    ''' Poisson pmf on 0..max_demand with the upper tail folded into the last bucket.
+    '''
+    k = np.arange(max_demand + 1)
+    log_factorial = np.concatenate([[0.0], np.cumsum(np.log(k[1:]))])
+    pmf = np.exp(k * np.log(max(mean, 1e-300)) - mean - log_factorial)
+    pmf[-1] += max(0.0, 1 - pmf.sum())
+    return pmf
+
+
+def fare_class_dp(fares, means, capacity, max_demand=None):
+    ''' Exact single-leg DP over discrete fare buckets with Poisson demand (lowest class books first).
+
+        V_j(x) = E[ max_{u <= min(D_j, x)} fare_j * u + V_{j-1}(x - u) ], solved for every x at once.
+        Returns (protection_levels, values) where protection_levels are the optimal y_1..y_{n-1}
+        and values[x] = V_n(x) is the expected revenue with x seats; np.diff(values) are the bid prices.
+    '''
+    fares, means = np.asarray(fares, dtype=float), np.asarray(means, dtype=float)
+    if max_demand is None:
+        max_demand = int(max(capacity, np.ceil(means.max() + 10 * np.sqrt(means.max() + 1))))
+    seats = np.arange(capacity + 1)
+    demand = np.arange(max_demand + 1)
+
+    values = np.zeros(capacity + 1)
+    protection_levels = []
+    for j, (fare, mean) in enumerate(zip(fares, means)):
+        if j == 0:
+            protect = 0
+        else:
+            # Protect seats while the marginal value of a seat for the higher classes beats this fare
+            marginal = np.diff(values)
+            protect = int(np.count_nonzero(marginal > fare))
+            protection_levels.append(protect)
+        sold = np.minimum(demand[None, :], np.maximum(seats[:, None] - protect, 0))
+        values = (fare * sold + values[seats[:, None] - sold]) @ _poisson_pmf(mean, max_demand)
+    return np.array(protection_levels), values
+
+
+if __name__ == '__main__':
+    fares = [1800, 1200, 950, 700, 420, 310, 220]
+    means = [4, 6, 8, 15, 30, 45, 60]
+    stds = [2, 3, 3, 5, 8, 10, 12]
+    capacity = 180
+    for name, protection in [('EMSR-a', emsr_a(fares, means, stds, capacity)),
+                             ('EMSR-b', emsr_b(fares, means, stds, capacity)),
+                             ('DP', fare_class_dp(fares, means, capacity)[0])]:
+        print(name, dict(zip(FARE_PRODUCTS, booking_limits(np.round(protection), capacity).tolist())))
@@ -0,0 +1,136 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lib.bid_price.bid_price_generator import BidCalculator, solve_value_tables, bid_prices_from_values
+
+KEY_COLUMNS = ['flight_number', 'cabin', 'departure_date']
+SHAPE_COLUMNS = ['capacity', 'dtd', 'price_min', 'price_max']
+
+
+class FleetBidPrices:
+    ''' Result of a fleet-wide solve.
+        bid_prices is one long table with a row per (flight, cabin, departure date, seats left, DTD).
+        n_solves counts the problems actually solved, n_cached the ones read from the cache.
+    '''
+    def __init__(self, bid_prices, n_solves, elapsed, n_cached=0):
+        self.bid_prices = bid_prices
+        self.n_solves = n_solves
+        self.elapsed = elapsed
+        self.n_cached = n_cached
+
+    @property
+    def solves_per_second(self):
+        return self.n_solves / self.elapsed if self.elapsed > 0 else float('inf')
+
+    def __repr__(self):
+        return (f'FleetBidPrices({self.n_solves} solves in {self.elapsed:.2f}s, {self.solves_per_second:.1f} solves/s, '
+                f'{self.n_cached} cached)')
+
+
+def _purchase_probabilities(problems, price_min, price_max, T):
+    ''' Stacked BidCalculator.purchase_probability, one (T+1, n_prices) table per problem.
+        The arrival_rate column may hold a scalar or a per-DTD demand curve.
+    '''
+    demand_curves = problems['arrival_rate'] if 'arrival_rate' in problems else [None] * len(problems)
+    return np.stack([
+        BidCalculator((price_min, price_max), demand_curve=demand_curve).purchase_probability(T)
+        for demand_curve in demand_curves
+    ])
+
+
+def _solve_stack(C, T, prices, probability_purchase):
+    ''' Solve a stack of same-shaped problems in one array computation; (n, C+1, T+1) value tables. '''
+    return solve_value_tables(C, T, prices, probability_purchase)
+
+
+def calculate_fleet_bid_prices(schedule, processes=None, max_cells=250_000, cache=None):
+    ''' Bid prices for every row of a schedule in one call.
+
+        schedule needs the columns flight_number, cabin, departure_date, capacity, dtd, price_min and price_max.
+        An optional arrival_rate column is the demand per period, either a scalar or a per-DTD curve;
+        otherwise BidCalculator.arrival_rate is used.
+        Rows sharing (capacity, dtd, price range) are stacked into one array computation, in chunks of at
+        most max_cells (seats x prices) per time step so the working set stays in cache, and the chunks are
+        spread across a process pool (processes=1 solves everything in this process).
+        cache: optional lib.bid_price.cache.BidPriceCache. Every row is keyed like BidCalculator.value_table
+        keys the same problem, so rows solved before (here or by a BidCalculator) are read back instead
+        of being solved, and the rest are stored once solved.
+    '''
+    start = time.perf_counter()
+    schedule = schedule.reset_index(drop=True)
+    stacks = schedule.groupby(SHAPE_COLUMNS, sort=False).indices
+
+    # Per stack: its rows, shape and one value table slot per row, filled from the cache where possible
+    tables = []
+    jobs = []
+    for (C, T, price_min, price_max), rows in stacks.items():
+        C, T, price_min, price_max = int(C), int(T), int(price_min), int(price_max)
+        prices = np.arange(price_min, price_max, dtype=float)
+        probability_purchase = _purchase_probabilities(schedule.iloc[rows], price_min, price_max, T)
+        keys = [None] * len(rows)
+        values = [None] * len(rows)
+        if cache is not None:
+            keys = [cache.key(C, T, prices, table) for table in probability_purchase]
+            values = [cache.get(key) for key in keys]
+        tables.append((rows, C, T, keys, values))
+
+        todo = [i for i, table in enumerate(values) if table is None]
+        chunk = max(1, max_cells // max(1, C * (price_max - price_min)))
+        for i in range(0, len(todo), chunk):
+            problems = todo[i:i + chunk]
+            jobs.append((len(tables) - 1, problems, (C, T, prices, probability_purchase[problems])))
+
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(jobs) <= 1:
+        solved = [_solve_stack(*args) for _, _, args in jobs]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            futures = [pool.submit(_solve_stack, *args) for _, _, args in jobs]
+            solved = [future.result() for future in futures]
+
+    for (stack, problems, _), stacked in zip(jobs, solved):
+        _, _, _, keys, values = tables[stack]
+        for i, table in zip(problems, stacked):
+            values[i] = table
+            if cache is not None:
+                cache.put(keys[i], table)
+
+    # Lay every (problem, s, t) out as one columnar table
+    frames = []
+    for rows, C, T, _, values in tables:
+        bids = bid_prices_from_values(np.stack(values))[:, 1:, 1:]
+        seats, dtd = np.meshgrid(np.arange(1, C + 1), np.arange(1, T + 1), indexing='ij')
+        cells = C * T
+        frame = {col: np.repeat(schedule[col].to_numpy()[rows], cells) for col in KEY_COLUMNS}
+        frame['seats'] = np.tile(seats.ravel(), len(rows)).astype(np.int32)
+        frame['dtd'] = np.tile(dtd.ravel(), len(rows)).astype(np.int32)
+        frame['bid_price'] = bids.reshape(-1)
+        frames.append(pd.DataFrame(frame))
+
+    columns = KEY_COLUMNS + ['seats', 'dtd', 'bid_price']
+    bid_prices = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    for col in ['flight_number', 'cabin']:
+        bid_prices[col] = bid_prices[col].astype('category')
+
+    n_solves = sum(len(problems) for _, problems, _ in jobs)
+    return FleetBidPrices(bid_prices, n_solves, time.perf_counter() - start, n_cached=len(schedule) - n_solves)
+
+
+if __name__ == '__main__':
+    schedule = pd.DataFrame({
+        'flight_number': ['NZ103', 'NZ103', 'NZ105', 'NZ105', 'NZ107'],
+        'cabin': ['ECONOMY', 'BUSINESS', 'ECONOMY', 'BUSINESS', 'ECONOMY'],
+        'departure_date': ['2024-06-05'] * 5,
+        'capacity': [180, 30, 180, 30, 180],
+        'dtd': [60, 60, 60, 60, 30],
+        'price_min': [100, 500, 100, 500, 100],
+        'price_max': [400, 1500, 400, 1500, 400],
+        'arrival_rate': [0.34, 0.08, 0.3, 0.1, 0.5],
+    })
+    result = calculate_fleet_bid_prices(schedule)
+    print(result)
+    print(result.bid_prices.head())
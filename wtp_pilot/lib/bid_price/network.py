@@ -0,0 +1,139 @@
+''' Network (O&D) bid prices from the deterministic LP.
+
+    max  fare . y   s.t.  A y <= capacity,  0 <= y <= demand
+    where A is the sparse legs x itineraries incidence matrix built from parsed segments.
+    The duals of the capacity rows are the leg bid prices; an itinerary is worth selling when its
+    fare covers the sum of the bid prices of the legs it uses.
+'''
+import highspy
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+LEG_COLUMNS = ['CarrierCode', 'Departure', 'Arrival', 'DepartureDateTime']
+
+
+def incidence_matrix(segments, leg_columns=LEG_COLUMNS):
+    ''' Build the legs x itineraries 0/1 matrix from a parse_flight_details segments table.
+        A leg is one row of leg_columns; the same physical flight shared by several itineraries
+        (e.g. a nonstop sold alone and as the first leg of a connection) maps to one row.
+        Returns (A, legs, itinerary_ids).
+    '''
+    leg_codes = segments.groupby(leg_columns, sort=False).ngroup().to_numpy()
+    itinerary_codes, itinerary_ids = pd.factorize(segments['ItineraryID'])
+    legs = segments[leg_columns].drop_duplicates().reset_index(drop=True)
+    A = sparse.csr_matrix(
+        (np.ones(len(segments)), (leg_codes, itinerary_codes)),
+        shape=(len(legs), len(itinerary_ids))
+    )
+    A.data[:] = 1 # an itinerary uses a leg once even if a segment is listed twice
+    return A, legs, pd.Index(itinerary_ids, name='ItineraryID')
+
+
+class NetworkBidPriceModel:
+    ''' Deterministic LP over a fixed network, re-solved as the demand forecast changes.
+
+        fares: itinerary revenue, a Series indexed by ItineraryID (e.g. prices.set_index('ItineraryID')['Total']).
+        capacity: remaining seats per leg, a scalar or an array aligned with self.legs.
+        The incidence matrix and the HiGHS model are built once. A new forecast only changes the
+        variable bounds, so every solve after the first starts the simplex from the previous
+        optimal basis (setBasis), which is still dual feasible and usually a few pivots from the
+        new optimum.
+    '''
+    def __init__(self, segments, fares, capacity, leg_columns=LEG_COLUMNS):
+        self.A, self.legs, self.itineraries = incidence_matrix(segments, leg_columns)
+        self.fares = pd.Series(fares).reindex(self.itineraries).fillna(0).to_numpy(dtype=float)
+        self.capacity = np.broadcast_to(np.asarray(capacity, dtype=float), (len(self.legs),)).copy()
+        self.bid_prices = None
+        self.allocation = None
+        self.n_lp_solves = 0
+        self.n_warm_starts = 0
+        self.simplex_iterations = 0
+        self._basis = None
+        self._highs = self._build_model()
+
+    def _build_model(self):
+        ''' max fare . y as min -fare . y, with the demand bounds filled in by solve(). '''
+        A = self.A.tocsc()
+        lp = highspy.HighsLp()
+        lp.num_col_, lp.num_row_ = A.shape[1], A.shape[0]
+        lp.col_cost_ = -self.fares
+        lp.col_lower_ = np.zeros(A.shape[1])
+        lp.col_upper_ = np.zeros(A.shape[1])
+        lp.row_lower_ = np.full(A.shape[0], -highspy.kHighsInf)
+        lp.row_upper_ = self.capacity
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = A.indptr
+        lp.a_matrix_.index_ = A.indices
+        lp.a_matrix_.value_ = A.data
+        highs = highspy.Highs()
+        highs.setOptionValue('output_flag', False)
+        highs.setOptionValue('solver', 'simplex')
+        highs.passModel(lp)
+        return highs
+
+    def _demand_array(self, demand):
+        if isinstance(demand, pd.Series):
+            demand = demand.reindex(self.itineraries).fillna(0)
+        return np.broadcast_to(np.asarray(demand, dtype=float), (len(self.itineraries),))
+
+    def solve(self, demand):
+        ''' Leg bid prices for a demand forecast (array aligned with self.itineraries or a Series
+            indexed by ItineraryID). Returns self.legs with a bid_price column.
+        '''
+        demand = self._demand_array(demand)
+        highs = self._highs
+        highs.changeColsBounds(len(demand), np.arange(len(demand), dtype=np.int32), np.zeros_like(demand), demand)
+        if self._basis is not None:
+            highs.setBasis(self._basis)
+            self.n_warm_starts += 1
+        highs.run()
+        if highs.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            raise RuntimeError(f'Network LP failed: {highs.modelStatusToString(highs.getModelStatus())}')
+        self.n_lp_solves += 1
+        self.simplex_iterations += highs.getInfo().simplex_iteration_count
+        self._basis = highs.getBasis()
+
+        solution = highs.getSolution()
+        self.allocation = np.array(solution.col_value)
+        self.bid_prices = np.maximum(-np.array(solution.row_dual), 0)
+        return self.legs.assign(bid_price=self.bid_prices)
+
+    def itinerary_bid_prices(self):
+        ''' Sum of leg bid prices for every itinerary: the minimum fare worth accepting.
+        '''
+        return pd.Series(self.A.T @ self.bid_prices, index=self.itineraries, name='bid_price')
+
+
+if __name__ == '__main__':
+    import time
+
+    # A synthetic hub network: nonstops into the hub plus one-stop connections through it
+    rng = np.random.default_rng(0)
+    n_spokes, n_days = 40, 7
+    rows, itinerary_id = [], 0
+    for day in range(n_days):
+        departure = pd.Timestamp('2024-06-01') + pd.Timedelta(days=day)
+        for origin in range(n_spokes):
+            itinerary_id += 1
+            rows.append((itinerary_id, 'NZ', f'S{origin}', 'AKL', departure))
+            for dest in range(n_spokes):
+                if dest != origin:
+                    itinerary_id += 1
+                    rows.append((itinerary_id, 'NZ', f'S{origin}', 'AKL', departure))
+                    rows.append((itinerary_id, 'NZ', 'AKL', f'S{dest}', departure + pd.Timedelta(hours=3)))
+    segments = pd.DataFrame(rows, columns=['ItineraryID'] + LEG_COLUMNS)
+    n_itineraries = segments['ItineraryID'].nunique()
+    fares = pd.Series(rng.uniform(150, 600, n_itineraries), index=np.arange(1, n_itineraries + 1))
+
+    start = time.perf_counter()
+    model = NetworkBidPriceModel(segments, fares, capacity=180)
+    demand = rng.gamma(2.0, 3.0, n_itineraries)
+    model.solve(demand)
+    print(f'{n_itineraries} itineraries, {len(model.legs)} legs: {time.perf_counter() - start:.2f}s')
+    for _ in range(5):
+        start = time.perf_counter()
+        model.solve(demand * rng.uniform(0.98, 1.02, n_itineraries))
+        print(f'  re-solve {time.perf_counter() - start:.3f}s')
+    print(f'LP solves: {model.n_lp_solves}, warm starts: {model.n_warm_starts}, '
+          f'simplex iterations: {model.simplex_iterations}')
@@ -0,0 +1,71 @@
+from lib.bid_price.bid_price_generator import bid_prices_from_values
+
+
+class BidPriceSession:
+    ''' Stateful bid prices for one flight and cabin.
+
+        The value table is solved once for the whole (capacity, days to departure) horizon.
+        Bookings and elapsed days only move the current (seats, dtd) position inside that table,
+        so reading the new bid price is a lookup. The table is rebuilt only when the demand/WTP
+        inputs change through update_calculator.
+    '''
+    def __init__(self, calculator, capacity, days_to_departure):
+        self.calculator = calculator
+        self.seats = capacity
+        self.dtd = days_to_departure
+        self.solve()
+
+    def solve(self):
+        ''' Solve the value table from the current position to departure.
+        '''
+        self.values = self.calculator.value_table(self.seats, self.dtd)
+        self.bids = bid_prices_from_values(self.values)
+
+    @property
+    def bid_price(self):
+        ''' Bid price for the current number of seats left and days to departure.
+        '''
+        if self.seats == 0:
+            return float('inf') # sold out: no fare clears the bid price
+        return float(self.bids[self.seats, self.dtd])
+
+    @property
+    def expected_revenue(self):
+        return float(self.values[self.seats, self.dtd])
+
+    def accept(self, fare):
+        ''' True if a request at this fare should be sold.
+        '''
+        return fare >= self.bid_price
+
+    def record_booking(self, seats=1):
+        ''' A booking took seats; returns the new bid price.
+        '''
+        if seats > self.seats:
+            raise ValueError(f'Cannot book {seats} seats, only {self.seats} left')
+        self.seats -= seats
+        return self.bid_price
+
+    def advance_day(self, days=1):
+        ''' Days passed without changing the inputs; returns the new bid price.
+        '''
+        if days > self.dtd:
+            raise ValueError(f'Cannot advance {days} days, only {self.dtd} left to departure')
+        self.dtd -= days
+        return self.bid_price
+
+    def update_calculator(self, calculator):
+        ''' New demand or WTP inputs: re-solve from the current position; returns the new bid price.
+        '''
+        self.calculator = calculator
+        self.solve()
+        return self.bid_price
+
+
+if __name__ == '__main__':
+    from lib.bid_price.bid_price_generator import BidCalculator
+
+    session = BidPriceSession(BidCalculator(price_range=(100, 400)), capacity=180, days_to_departure=365)
+    print('bid price:', session.bid_price)
+    print('after booking:', session.record_booking())
+    print('after a day:', session.advance_day())
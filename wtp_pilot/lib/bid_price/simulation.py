@@ -0,0 +1,104 @@
+''' Monte Carlo simulation of a flight's booking horizon.
+
+    All sample paths are advanced together, one day at a time: arrivals are Poisson draws from the
+    calculator's demand curve, buyers are binomial draws from its WTP curve at the offered fare,
+    and a day's requests are only sold while the offered fare covers the bid price.
+'''
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+def optimal_price_table(calculator, C, T):
+    ''' Revenue-maximising price for every (seats left, DTD) of the calculator's DP, shape (C+1, T+1).
+    '''
+    price_min, price_max = calculator.price_range
+    prices = np.arange(price_min, price_max, dtype=float)
+    probability_purchase = calculator.purchase_probability(T)
+    bids = calculator.bid_price_table(C, T)
+    best = np.full((C + 1, T + 1), float(price_max - 1))
+    for t in range(1, T + 1):
+        # argmax_p q_t(p) * (p - bid) is the price chosen by V at (x, t)
+        gain = probability_purchase[t] * (prices - bids[1:, t, None])
+        best[1:, t] = prices[gain.argmax(axis=1)]
+    return best
+
+
+class SimulationResult:
+    ''' Per-path outcomes: revenue, load_factor and spill are (n_paths,), bookings is (n_paths, n_days)
+        with day 0 being the first day of the horizon (DTD = horizon).
+    '''
+    def __init__(self, revenue, load_factor, spill, bookings):
+        self.revenue = revenue
+        self.load_factor = load_factor
+        self.spill = spill
+        self.bookings = bookings
+
+    def summary(self, confidence=0.95):
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        rows = {}
+        for name in ['revenue', 'load_factor', 'spill']:
+            values = getattr(self, name)
+            mean, std = values.mean(), values.std(ddof=1)
+            half_width = z * std / np.sqrt(len(values))
+            p5, p50, p95 = np.percentile(values, [5, 50, 95])
+            rows[name] = {'mean': mean, 'std': std, 'ci_low': mean - half_width, 'ci_high': mean + half_width,
+                          'p5': p5, 'p50': p50, 'p95': p95}
+        return pd.DataFrame(rows).T
+
+
+def simulate_booking_horizon(calculator, capacity, horizon, fares=None, n_paths=10_000, seed=None, bid_control=True):
+    ''' Simulate n_paths booking horizons of one flight and cabin under a pricing policy.
+
+        fares: the policy, a fixed fare or a (capacity+1, horizon+1) table indexed by (seats left, DTD);
+               defaults to the calculator's optimal price table.
+        bid_control: only sell while the offered fare is at least the calculator's bid price.
+        The WTP curve is read at the offered fare rounded onto the calculator's price grid.
+    '''
+    rng = np.random.default_rng(seed)
+    price_min, price_max = calculator.price_range
+    arrival_rates = calculator.arrival_rates(horizon)
+    wtp = calculator.wtp_table(horizon)
+    if fares is None:
+        fares = optimal_price_table(calculator, capacity, horizon)
+    fares = np.broadcast_to(np.asarray(fares, dtype=float), (capacity + 1, horizon + 1))
+    if bid_control:
+        bids = calculator.bid_price_table(capacity, horizon)
+
+    seats = np.full(n_paths, capacity)
+    revenue = np.zeros(n_paths)
+    spill = np.zeros(n_paths, dtype=np.int64)
+    bookings = np.zeros((n_paths, horizon), dtype=np.int32)
+    for day, t in enumerate(range(horizon, 0, -1)):
+        offered = fares[seats, t]
+        open_for_sale = seats > 0
+        if bid_control:
+            open_for_sale &= offered >= bids[seats, t]
+
+        price_index = np.clip(np.rint(offered).astype(int) - price_min, 0, price_max - price_min - 1)
+        arrivals = rng.poisson(arrival_rates[t], n_paths)
+        buyers = rng.binomial(arrivals, wtp[t, price_index])
+        sold = np.where(open_for_sale, np.minimum(buyers, seats), 0)
+
+        spill += buyers - sold
+        revenue += sold * offered
+        seats -= sold
+        bookings[:, day] = sold
+
+    load_factor = (capacity - seats) / capacity
+    return SimulationResult(revenue, load_factor, spill, bookings)
+
+
+if __name__ == '__main__':
+    import time
+    from lib.bid_price.bid_price_generator import BidCalculator
+    from lib.bid_price.curves import logistic_wtp
+
+    calculator = BidCalculator((100, 400), demand_curve=0.8, wtp_curve=logistic_wtp(250, 40))
+    for name, fares in [('optimal', None), ('fixed 250', 250), ('fixed 180', 180)]:
+        start = time.perf_counter()
+        result = simulate_booking_horizon(calculator, capacity=180, horizon=365, fares=fares, n_paths=10_000, seed=0,
+                                          bid_control=fares is None)
+        print(f'{name}: {time.perf_counter() - start:.2f}s')
+        print(result.summary().round(3))
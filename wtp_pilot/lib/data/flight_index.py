@@ -0,0 +1,49 @@
+''' Rows of one flight / class / departure date without scanning the table.
+
+    FlightIndex sorts a frame by its key columns once (stably, so rows keep their file order within
+    a group) and maps every key, and every leading part of a key, to the slice of sorted rows it
+    covers. rows('NZ631', 'Economy') is then a dict lookup and an iloc slice, the same rows in the
+    same order as chaining df[df['flight_number'] == ...][df['class'] == ...], however large the
+    table grows.
+'''
+import numpy as np
+import pandas as pd
+
+FLIGHT_KEYS = ['flight_number', 'class', 'departure_date']
+
+
+def _same(value):
+    return value
+
+
+class FlightIndex:
+    def __init__(self, df, keys=None):
+        self.keys = list(keys) if keys is not None else [k for k in FLIGHT_KEYS if k in df]
+        self.df = df.sort_values(self.keys, kind='stable')
+        # Dates (or their strings) look up as Timestamps
+        self._convert = [pd.Timestamp if pd.api.types.is_datetime64_any_dtype(self.df[k]) else _same for k in self.keys]
+
+        # A new group starts wherever any of the first k key columns changes
+        changed = np.zeros(len(self.df), dtype=bool)
+        self.slices = {}
+        for depth, k in enumerate(self.keys, start=1):
+            codes = pd.factorize(self.df[k])[0]
+            changed[1:] |= codes[1:] != codes[:-1]
+            starts = np.flatnonzero(np.r_[len(self.df) > 0, changed[1:]])
+            ends = np.r_[starts[1:], len(self.df)]
+            values = zip(*(self.df[key].to_numpy()[starts] for key in self.keys[:depth]))
+            self.slices.update((self._lookup_key(value), slice(a, b)) for value, a, b in zip(values, starts, ends))
+
+    def _lookup_key(self, values):
+        return tuple(convert(v) for convert, v in zip(self._convert, values))
+
+    def rows(self, *values):
+        ''' Rows matching the first len(values) keys, e.g. rows(flight_number, class) or
+            rows(flight_number, class, departure_date). Empty when nothing matches. The rows are a
+            copy, so callers can change them without touching the shared index.
+        '''
+        return self.df.iloc[self.slices.get(self._lookup_key(values), slice(0, 0))].copy()
+
+    def groups(self):
+        ''' Every full key in the index, in sorted order. '''
+        return [key for key in self.slices if len(key) == len(self.keys)]
@@ -0,0 +1,139 @@
+''' Dashboard KPIs from pre-aggregated sums instead of raw rows.
+
+    A KpiCube keeps, for every grain (DCP, week, day of week, TF, ...), the sum and the non-null
+    count of each measure per key (flight / class, departure date, ...) and grain value. Every
+    KPI the dashboards show is a sum, a mean, or a mean of per-grain sums or means, so all of them
+    come out of these small tables exactly. New rows are aggregated on their own and added to
+    the tables, so the cube never has to go back over rows it has already seen. The tables are
+    saved as one small Parquet file per grain (to_parquet / read_parquet); loader.load_kpi_cube
+    keeps them next to the dataset cache and only aggregates the rows appended since.
+
+        cube = load_kpi_cube('wtp_mock_data4.csv', 'flight')
+        cube.sums('DCP', 'NZ631', 'Economy')['number_of_checkouts'].mean()
+'''
+from pathlib import Path
+
+import pandas as pd
+
+
+def week(df):
+    ''' The Sunday ending each row's week, the label resample('W') gives it. '''
+    return df['date'].dt.to_period('W-SUN').dt.end_time.dt.normalize()
+
+
+def day_name(df):
+    return df['date'].dt.day_name()
+
+
+# keys: columns a KPI is read for; grains and measures: a column name or a function of the rows
+CUBE_SPECS = {
+    # wtp_mock_data*.csv per flight and class (dashboard.py)
+    'flight': {
+        'keys': ['flight_number', 'class'],
+        'grains': {'DCP': 'DCP', 'week': week, 'day_name': day_name},
+        'measures': {
+            'number_of_checkouts': 'number_of_checkouts',
+            'WTP2': 'WTP2',
+            'checkout_rate': 'checkout_rate',
+            'daily_revenue': 'daily_revenue',
+            'wtp_revenue': lambda df: df['WTP2'] * df['number_of_checkouts'],
+        },
+    },
+    # The whole of a wtp_mock_data*.csv file (simulation dashboard)
+    'daily': {
+        'keys': [],
+        'grains': {'week': week, 'day_name': day_name},
+        'measures': {'checkout_rate': 'checkout_rate', 'WTP': 'WTP', 'number_of_checkouts': 'number_of_checkouts'},
+    },
+    # The booking simulation per departure date (simulation dashboard)
+    'booking': {
+        'keys': ['departure_date'],
+        'grains': {'TF': 'TF'},
+        'measures': {
+            'booking': 'booking',
+            'WTP': 'WTP',
+            'fare': 'fare',
+            'revenue': lambda df: df['booking'] * df['fare'],
+        },
+    },
+}
+
+
+def _column(df, spec):
+    return df[spec] if isinstance(spec, str) else spec(df)
+
+
+class KpiCube:
+    def __init__(self, keys, grains, measures):
+        self.keys = list(keys)
+        self.grains = grains
+        self.measures = measures
+        self.tables = {}
+
+    @classmethod
+    def from_spec(cls, name, rows=None):
+        cube = cls(**CUBE_SPECS[name])
+        if rows is not None:
+            cube.update(rows)
+        return cube
+
+    @classmethod
+    def read_parquet(cls, directory, name):
+        ''' A cube of CUBE_SPECS[name] saved by to_parquet. '''
+        cube = cls(**CUBE_SPECS[name])
+        files = {grain: Path(directory) / f'{grain}.parquet' for grain in cube.grains}
+        cube.tables = {grain: pd.read_parquet(file) for grain, file in files.items() if file.exists()}
+        return cube
+
+    def to_parquet(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for grain, table in self.tables.items():
+            table.to_parquet(directory / f'{grain}.parquet')
+
+    def update(self, rows):
+        ''' Add new rows to every grain table. Returns self. '''
+        if len(rows) == 0:
+            return self
+        values = pd.DataFrame({name: _column(rows, spec) for name, spec in self.measures.items()})
+        for grain, spec in self.grains.items():
+            by = [rows[k] for k in self.keys] + [_column(rows, spec).rename(grain)]
+            part = values.groupby(by, observed=True).agg(['sum', 'count'])
+            part.columns = [m if stat == 'sum' else f'{m}_count' for m, stat in part.columns]
+            table = self.tables.get(grain)
+            if table is not None:
+                part = table.add(part, fill_value=0)
+            counts = [f'{m}_count' for m in self.measures]
+            self.tables[grain] = part.astype({c: 'int64' for c in counts}).sort_index()
+        return self
+
+    def _select(self, grain, key):
+        table = self.tables.get(grain)
+        if table is None:
+            return pd.DataFrame(columns=[c for m in self.measures for c in (m, f'{m}_count')])
+        if not key:
+            return table
+        levels = table.index.levels[:len(key)]
+        key = tuple(pd.Timestamp(v) if isinstance(level, pd.DatetimeIndex) else v for v, level in zip(key, levels))
+        try:
+            return table.loc[key] # a binary search on the sorted index
+        except KeyError:
+            return table.iloc[:0].droplevel(list(range(len(key))))
+
+    def sums(self, grain, *key):
+        ''' Sum of every measure per grain value, for one key (all the keys, in order). '''
+        return self._select(grain, key)[list(self.measures)]
+
+    def means(self, grain, measure, *key, freq=None):
+        ''' Mean of a measure per grain value, as groupby(grain)[measure].mean() gives it.
+            freq fills in missing periods with NaN the way resample(freq).mean() does.
+        '''
+        table = self._select(grain, key)
+        mean = (table[measure] / table[f'{measure}_count'].where(table[f'{measure}_count'] > 0)).rename(measure)
+        if freq is not None and len(mean):
+            mean = mean.reindex(pd.date_range(mean.index.min(), mean.index.max(), freq=freq, name=mean.index.name))
+        return mean
+
+    def total(self, measure, *key):
+        ''' Sum of a measure over every row of a key. '''
+        return self.sums(next(iter(self.grains)), *key)[measure].sum()
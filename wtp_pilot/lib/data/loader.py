@@ -0,0 +1,211 @@
+''' Input datasets for the apps, loaded once per process.
+
+    load_dataset('wtp_mock_data4.csv') reads wtp_pilot/inputs/<name> with explicit dtypes:
+    flight / class / airport columns as categoricals, dates parsed. The frame is kept in a
+    process-wide cache (shared by every Streamlit session and rerun) until the file's mtime
+    changes. CSVs over PARQUET_MIN_BYTES are also written to Parquet on first load, so a new
+    process reads the typed columns back instead of parsing the CSV again.
+
+    KPI cubes (kpi_cube.py) are saved under KPI_DIR with the size and a hash of the part of the
+    CSV they cover. When rows are appended to the CSV only those rows are read and added to the
+    saved cube; a CSV that was rewritten is aggregated again in full. refresh_kpi_cubes is the
+    batch job that brings every cube in KPI_CUBES up to date (python -m lib.data.loader).
+'''
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from lib.data.flight_index import FlightIndex
+from lib.data.kpi_cube import KpiCube
+
+INPUTS_DIR = Path(__file__).resolve().parents[2] / 'inputs'
+PARQUET_DIR = Path.home() / '.cache' / 'wtp_pilot' / 'inputs'
+PARQUET_MIN_BYTES = 1 << 20
+KPI_DIR = PARQUET_DIR / 'kpi'
+# The cubes the dashboards read: (dataset, kpi_cube.CUBE_SPECS name)
+KPI_CUBES = [
+    ('wtp_mock_data4.csv', 'flight'),
+    ('wtp_mock_data.csv', 'daily'),
+    ('booking_730_flights_36_2024_2025.csv', 'booking'),
+]
+
+# Applied to whichever of these columns a file has; other columns are inferred
+COLUMN_DTYPES = {
+    'flight_number': 'category',
+    'class': 'category',
+    'origin': 'category',
+    'destination': 'category',
+    'class_dcp': 'category',
+    'website_visit': 'int32',
+    'number_of_checkouts': 'int32',
+    'DCP': 'int16',
+    'WOY': 'int16',
+    'checkout_rate': 'float64',
+    'air_fare_usd': 'float64',
+    'daily_revenue': 'float64',
+    'WTP': 'float64',
+    'WTP2': 'float64',
+    'WOY_WTP': 'float64',
+    'average_time_onsite': 'float64',
+}
+DATE_COLUMNS = ['departure_date', 'date']
+
+_cache = {}
+_lock = threading.RLock() # building an index loads its frame through the cache too
+
+
+def read_csv(path):
+    ''' One input CSV (a path or a file object) with COLUMN_DTYPES and DATE_COLUMNS applied. '''
+    header = pd.read_csv(path, nrows=0).columns
+    if hasattr(path, 'seek'):
+        path.seek(0)
+    # wtp_mock_data4.csv was saved with its index
+    index_col = 0 if header[0].startswith('Unnamed') else None
+    return pd.read_csv(
+        path,
+        index_col=index_col,
+        dtype={c: t for c, t in COLUMN_DTYPES.items() if c in header},
+        parse_dates=[c for c in DATE_COLUMNS if c in header],
+    )
+
+
+def _cache_name(path):
+    ''' A file name for what is cached of path: its stem, and a hash of its full path so files of
+        the same name in different folders don't share it.
+    '''
+    digest = hashlib.sha1(str(Path(path).resolve()).encode()).hexdigest()[:16]
+    return f'{path.stem}-{digest}'
+
+
+def _parquet_path(path):
+    return PARQUET_DIR / f'{_cache_name(path)}.parquet'
+
+
+def _read(path):
+    if path.suffix != '.csv' or path.stat().st_size < PARQUET_MIN_BYTES:
+        return read_csv(path)
+
+    parquet = _parquet_path(path)
+    if parquet.exists() and parquet.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+        return pd.read_parquet(parquet)
+
+    df = read_csv(path)
+    PARQUET_DIR.mkdir(parents=True, exist_ok=True)
+    _write_atomic(parquet, df.to_parquet)
+    return df
+
+
+def _write_atomic(path, write):
+    ''' write(tmp) to a temporary file first so another process never reads a partial file. '''
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    os.close(fd)
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _prefix_hash(path, size):
+    ''' Hash of the first size bytes of path. '''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while size > 0:
+            chunk = f.read(min(size, 1 << 20))
+            if not chunk:
+                break
+            digest.update(chunk)
+            size -= len(chunk)
+    return digest.hexdigest()
+
+
+def _appended_rows(path, start, end):
+    ''' The whole lines between bytes start and end of a CSV, read with its header.
+        Returns (rows, the byte offset the lines end at).
+    '''
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(start)
+        tail = f.read(end - start)
+    tail = tail[:tail.rfind(b'\n') + 1] # a line still being written is left for next time
+    return read_csv(io.BytesIO(header + tail)), start + len(tail)
+
+
+def _kpi_cube(path, spec):
+    ''' The saved cube of path, with the rows appended since added, or the cube of the whole file
+        when there is no saved cube or the part it covers has changed. Saved again when it changed.
+    '''
+    directory = KPI_DIR / f'{_cache_name(path)}-{spec}'
+    state_path = directory / 'state.json'
+    size = path.stat().st_size
+    state = json.loads(state_path.read_text()) if state_path.exists() else None
+
+    if state is not None and state['size'] <= size and _prefix_hash(path, state['size']) == state['hash']:
+        if state['size'] == size:
+            return KpiCube.read_parquet(directory, spec)
+        rows, covered = _appended_rows(path, state['size'], size)
+        cube = KpiCube.read_parquet(directory, spec).update(rows)
+    else:
+        covered = size
+        cube = KpiCube.from_spec(spec, _cached(path, 'frame', lambda: _read(path)))
+
+    # Tables first and the state last: a state always describes tables that were written
+    cube.to_parquet(directory)
+    state = {'size': covered, 'hash': _prefix_hash(path, covered)}
+    _write_atomic(state_path, lambda tmp: Path(tmp).write_text(json.dumps(state)))
+    return cube
+
+
+def _cached(path, kind, build):
+    ''' build() for this version of the file at path, from the cache when it has one. '''
+    mtime = path.stat().st_mtime_ns
+    with _lock:
+        cached = _cache.get((path, kind))
+        if cached is None or cached[0] != mtime:
+            cached = _cache[(path, kind)] = (mtime, build())
+    return cached[1]
+
+
+def load_dataset(name, directory=INPUTS_DIR):
+    ''' A typed input dataset by file name. Callers get a shallow copy: adding or replacing columns
+        doesn't touch the cached frame, but don't modify values in place.
+    '''
+    path = Path(directory) / name
+    return _cached(path, 'frame', lambda: _read(path)).copy(deep=False)
+
+
+def load_flight_index(name, keys=None, directory=INPUTS_DIR):
+    ''' A FlightIndex over a dataset (see flight_index.py), built once per file version and keys.
+        keys defaults to whichever of flight_number, class and departure_date the file has.
+    '''
+    path = Path(directory) / name
+    return _cached(path, ('index', tuple(keys or ())),
+                   lambda: FlightIndex(_cached(path, 'frame', lambda: _read(path)), keys))
+
+
+def load_kpi_cube(name, spec, directory=INPUTS_DIR):
+    ''' The KpiCube of a dataset for one of kpi_cube.CUBE_SPECS, brought up to date with the saved
+        cube and the rows appended since once per file version.
+    '''
+    path = Path(directory) / name
+    return _cached(path, ('kpi', spec), lambda: _kpi_cube(path, spec))
+
+
+def refresh_kpi_cubes(cubes=KPI_CUBES, directory=INPUTS_DIR):
+    ''' Bring the saved cube of every (dataset, spec) that exists up to date. '''
+    for name, spec in cubes:
+        if (Path(directory) / name).exists():
+            load_kpi_cube(name, spec, directory)
+            print(f'{name}: {spec} cube up to date')
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+if __name__ == '__main__':
+    refresh_kpi_cubes()
@@ -0,0 +1,231 @@
+''' Amadeus flight offers for a window of departure dates, fetched concurrently.
+
+    FlightOffersClient talks to the Flight Offers Search API directly over one requests.Session, so
+    every worker thread reuses a pooled keep-alive connection instead of the SDK's connection per
+    call. All the dates of a +/- day_range window are requested at once on a bounded thread pool;
+    request starts are spaced to stay under the API's transactions per second, and a 429 is retried
+    after its Retry-After. Responses are kept in a shared on-disk cache with a TTL, so every app
+    process (and every Streamlit server) reuses them.
+'''
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TEST_BASE_URL = 'https://test.api.amadeus.com'
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'wtp_pilot' / 'flight_offers'
+
+
+class RateLimiter:
+    ''' Spaces request starts at least 1 / per_second apart, across threads. '''
+    def __init__(self, per_second):
+        self.interval = 1 / per_second
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(start - now)
+
+
+def retry_delay(response, attempt):
+    ''' Seconds to wait before retrying: the response's Retry-After, in seconds or as an HTTP date,
+        or 2 ** attempt when it has none that parses.
+    '''
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError): # not a date, or one without a timezone
+            pass
+    return 2 ** attempt
+
+
+class ResponseCache:
+    ''' JSON responses on disk, keyed by a hash of the request (base URL included, so test and
+        production responses never mix), valid for ttl. Expired entries, and the oldest ones beyond
+        max_entries, are dropped on the first put and then every evict_every puts or evict_interval,
+        whichever comes first, rather than listing the directory on every put.
+    '''
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=timedelta(hours=6), max_entries=10000,
+                 evict_every=100, evict_interval=timedelta(minutes=5)):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.evict_interval = evict_interval
+        self._evict_lock = threading.Lock()
+        self._puts_since_evict = 0
+        self._last_evict = None
+
+    @staticmethod
+    def key(base_url, path, params):
+        return hashlib.sha256(json.dumps([base_url, path, params], sort_keys=True).encode()).hexdigest()
+
+    def get(self, key):
+        path = self.directory / f'{key}.json'
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl.total_seconds():
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key, value):
+        # Write to a temporary file first so other processes never read a partial response
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp, self.directory / f'{key}.json')
+        if self._evict_due():
+            self.evict()
+
+    def _evict_due(self):
+        with self._evict_lock:
+            self._puts_since_evict += 1
+            now = time.monotonic()
+            if (self._last_evict is not None and self._puts_since_evict < self.evict_every
+                    and now - self._last_evict < self.evict_interval.total_seconds()):
+                return False
+            self._puts_since_evict = 0
+            self._last_evict = now
+            return True
+
+    def evict(self):
+        entries = []
+        for path in self.directory.glob('*.json'):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError: # evicted by another process
+                continue
+        entries.sort()
+        expired_before = time.time() - self.ttl.total_seconds()
+        excess = len(entries) - self.max_entries
+        for i, (mtime, path) in enumerate(entries):
+            if mtime >= expired_before and i >= excess:
+                break
+            path.unlink(missing_ok=True)
+
+
+class FlightOffersClient:
+    ''' Flight Offers Search with connection reuse, a date fan-out pool, rate limiting and a disk cache.
+
+        Credentials default to AMADEUS_CLIENT_ID / AMADEUS_CLIENT_SECRET. The test environment allows
+        10 transactions per second; set requests_per_second for production. cache=None turns the
+        disk cache off.
+    '''
+    def __init__(self, client_id=None, client_secret=None, base_url=TEST_BASE_URL, max_workers=16,
+                 requests_per_second=10, cache=ResponseCache, max_retries=3, timeout=30):
+        self.client_id = client_id or os.getenv('AMADEUS_CLIENT_ID')
+        self.client_secret = client_secret or os.getenv('AMADEUS_CLIENT_SECRET')
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.cache = cache() if isinstance(cache, type) else cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._token_lock = threading.Lock()
+        self._token = None
+        self._token_expires = 0.0
+
+    def _access_token(self, refresh=False):
+        with self._token_lock:
+            if refresh or self._token is None or time.monotonic() > self._token_expires:
+                response = self.session.post(
+                    f'{self.base_url}/v1/security/oauth2/token',
+                    data={'grant_type': 'client_credentials', 'client_id': self.client_id,
+                          'client_secret': self.client_secret},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                token = response.json()
+                self._token = token['access_token']
+                self._token_expires = time.monotonic() + token.get('expires_in', 1799) - 60
+            return self._token
+
+    def get(self, path, params):
+        ''' GET an API path, through the cache. Returns the decoded JSON body. '''
+        key = self.cache.key(self.base_url, path, params) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # Every pass either retries (a token refresh once, plus up to max_retries) or returns or raises
+        attempt = 0
+        refreshed = False
+        while True:
+            self.rate_limiter.wait()
+            response = self.session.get(
+                f'{self.base_url}{path}', params=params, timeout=self.timeout,
+                headers={'Authorization': f'Bearer {self._access_token()}'},
+            )
+            if response.status_code == 401 and not refreshed:
+                self._access_token(refresh=True)
+                refreshed = True
+                continue
+            if response.status_code in (429, 500, 502, 503, 504) and attempt < self.max_retries:
+                time.sleep(retry_delay(response, attempt))
+                attempt += 1
+                continue
+            response.raise_for_status()
+            body = response.json()
+            if key is not None:
+                self.cache.put(key, body)
+            return body
+
+    def flight_offers(self, origin, dest, departure_date, adults=1, **params):
+        ''' Offers for one departure date, as the API's `data` list. '''
+        params = {'originLocationCode': origin, 'destinationLocationCode': dest,
+                  'departureDate': departure_date, 'adults': adults, **params}
+        return self.get('/v2/shopping/flight-offers', params)['data']
+
+    def flight_offers_window(self, origin, dest, flight_date, day_range=0, adults=1, **params):
+        ''' Offers for every date in flight_date +/- day_range, fetched concurrently and returned in
+            date order. A date whose request fails is reported and skipped, as get_flights_info did.
+        '''
+        centre = datetime.strptime(flight_date, '%Y-%m-%d')
+        dates = [(centre + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(-day_range, day_range + 1)]
+
+        def fetch(departure_date):
+            try:
+                return self.flight_offers(origin, dest, departure_date, adults, **params)
+            except requests.RequestException as error:
+                print(f'{origin}-{dest} {departure_date}: {error}')
+                return []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(dates))) as pool:
+            results = list(pool.map(fetch, dates))
+        return [offer for offers in results for offer in offers]
+
+    def close(self):
+        self.session.close()
+
+
+def get_flights_info(client, departure, arrival, flight_date, day_range=0):
+    ''' Drop-in for the apps' get_flights_info: all offers in the date window as one list. '''
+    return client.flight_offers_window(departure, arrival, flight_date, day_range)
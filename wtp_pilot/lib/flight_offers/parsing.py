@@ -0,0 +1,203 @@
+''' Flight offers responses to the segments / fares / flights / prices tables, in bulk.
+
+    normalize_offers walks the offers JSON once, appending plain values to one list per column
+    (no per-row dicts), then does every conversion on whole columns: ISO-8601 durations through one
+    vectorized regex, every timestamp through a single to_datetime, and the derived features (time
+    of day, haul, overnight) with numpy instead of row-wise apply. Each table is built once from its
+    finished columns. The tables and columns are the ones parse_flight_details returns, so the
+    apps' filters and merges work unchanged.
+'''
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+TIMES_OF_DAY = ['Early Morning', 'Morning', 'Afternoon', 'Evening', 'Night']
+TIME_OF_DAY_HOURS = [6, 12, 17, 21] # first hour of Morning, Afternoon, Evening, Night
+HAULS = ['Short-haul', 'Medium-haul', 'Long-haul']
+HAUL_MINUTES = [180, 360] # longest Short-haul and Medium-haul flight
+FARE_CATEGORIES = ['Low', 'Medium', 'High']
+
+ISO_DURATION = r'^P(?:(?P<days>\d+)D)?(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:[\d.]+S)?)?$'
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def duration_minutes(durations):
+    ''' ISO-8601 durations ('PT13H5M', 'P1DT2H') to whole minutes, for a list of them. '''
+    parts = pc.extract_regex(pa.array(durations, pa.string()), ISO_DURATION)
+    minutes = np.zeros(len(durations), dtype=np.int64)
+    for name, scale in [('days', 24 * 60), ('hours', 60), ('minutes', 1)]:
+        field = parts.field(name)
+        minutes += scale * pc.cast(pc.if_else(pc.equal(field, ''), '0', field), pa.int64()).to_numpy(zero_copy_only=False)
+    return minutes
+
+
+def time_of_day(hours):
+    ''' Departure hours to TIMES_OF_DAY labels. '''
+    return np.array(TIMES_OF_DAY, dtype=object)[np.searchsorted(TIME_OF_DAY_HOURS, hours, side='right')]
+
+
+def flight_haul(minutes):
+    ''' Total durations to HAULS labels. '''
+    return np.array(HAULS, dtype=object)[np.searchsorted(HAUL_MINUTES, minutes, side='left')]
+
+
+def is_overnight(departure_hours, arrival_hours, minutes):
+    ''' Arrives on a later day than it departs, judged from the hours and the total duration. '''
+    return ((arrival_hours < departure_hours) & (minutes > 60)) | ((arrival_hours + 24 - departure_hours) * 60 < minutes)
+
+
+def fare_category(total):
+    ''' Low / Medium / High price terciles, as pd.qcut(total, 3) labels them. '''
+    edges = np.quantile(total, [1 / 3, 2 / 3])
+    return pd.Categorical.from_codes(np.searchsorted(edges, total, side='left'), FARE_CATEGORIES, ordered=True)
+
+
+def _dates_and_times(stamps, dates, times, departure, arrival):
+    ''' The datetime, date and time columns parse_flight_details derives, for two slices of stamps. '''
+    return {
+        'DepartureDateTime': stamps[departure],
+        'ArrivalDateTime': stamps[arrival],
+        'DepartureDate': dates[departure],
+        'ArrivalDate': dates[arrival],
+        'DepartureTime': times[departure],
+        'ArrivalTime': times[arrival],
+    }
+
+
+def normalize_offers(offers):
+    ''' Offers (the API's `data` list) to (segments, fares, flights, prices) DataFrames.
+
+        ItineraryID numbers the itineraries and FlightID the segments from 1, in response order.
+        Fares has one row per segment and traveler pricing.
+    '''
+    seg = {c: [] for c in ['ItineraryID', 'FlightID', 'Duration', 'Departure', 'Arrival', 'CarrierCode',
+                           'DepartureDateTime', 'ArrivalDateTime', 'SegmentNumberOfStops', 'AircraftCode']}
+    fare = {c: [] for c in ['ItineraryID', 'FlightID', 'Cabin', 'Class', 'FareBasis', 'IncludedCheckedBagsQuantity']}
+    flight = {c: [] for c in ['ItineraryID', 'Departure', 'Arrival', 'DepartureDateTime', 'ArrivalDateTime',
+                              'TotalDuration', 'NumberOfStops']}
+    price = {c: [] for c in ['ItineraryID', 'Currency', 'Total', 'Base']}
+
+    itinerary_id = 0
+    flight_id = 0
+    for offer in offers:
+        details_by_segment = {}
+        for traveler_pricing in offer['travelerPricings']:
+            for detail in traveler_pricing['fareDetailsBySegment']:
+                details_by_segment.setdefault(detail['segmentId'], []).append(detail)
+        offer_price = offer['price']
+
+        for itinerary in offer['itineraries']:
+            itinerary_id += 1
+            segments = itinerary['segments']
+            for segment in segments:
+                flight_id += 1
+                seg['ItineraryID'].append(itinerary_id)
+                seg['FlightID'].append(flight_id)
+                seg['Duration'].append(segment['duration'])
+                seg['Departure'].append(segment['departure']['iataCode'])
+                seg['Arrival'].append(segment['arrival']['iataCode'])
+                seg['CarrierCode'].append(segment['carrierCode'])
+                seg['DepartureDateTime'].append(segment['departure']['at'])
+                seg['ArrivalDateTime'].append(segment['arrival']['at'])
+                seg['SegmentNumberOfStops'].append(segment['numberOfStops'])
+                seg['AircraftCode'].append(segment['aircraft']['code'] if 'aircraft' in segment else 'Unknown')
+
+                for detail in details_by_segment.get(segment['id'], ()):
+                    fare['ItineraryID'].append(itinerary_id)
+                    fare['FlightID'].append(flight_id)
+                    fare['Cabin'].append(detail['cabin'])
+                    fare['Class'].append(detail['class'])
+                    fare['FareBasis'].append(detail['fareBasis'])
+                    fare['IncludedCheckedBagsQuantity'].append(detail.get('includedCheckedBags', {}).get('quantity', 0))
+
+            flight['ItineraryID'].append(itinerary_id)
+            flight['Departure'].append(segments[0]['departure']['iataCode'])
+            flight['Arrival'].append(segments[-1]['arrival']['iataCode'])
+            flight['DepartureDateTime'].append(segments[0]['departure']['at'])
+            flight['ArrivalDateTime'].append(segments[-1]['arrival']['at'])
+            flight['TotalDuration'].append(itinerary['duration'])
+            flight['NumberOfStops'].append(len(segments) - 1)
+
+            price['ItineraryID'].append(itinerary_id)
+            price['Currency'].append(offer_price['currency'])
+            price['Total'].append(offer_price['total'])
+            price['Base'].append(offer_price['base'])
+
+    # One regex pass over every duration string and one datetime parse over every timestamp
+    n_segments, n_itineraries = flight_id, itinerary_id
+    minutes = duration_minutes(seg.pop('Duration') + flight.pop('TotalDuration'))
+    stamps = pd.to_datetime(seg.pop('DepartureDateTime') + seg.pop('ArrivalDateTime')
+                            + flight.pop('DepartureDateTime') + flight.pop('ArrivalDateTime'), format=DATETIME_FORMAT)
+    dates, times = stamps.date, stamps.time
+    edges = np.cumsum([0, n_segments, n_segments, n_itineraries, n_itineraries])
+    seg_departure, seg_arrival, departure, arrival = (slice(a, b) for a, b in zip(edges[:-1], edges[1:]))
+    total_minutes = minutes[n_segments:]
+    seg_times = _dates_and_times(stamps, dates, times, seg_departure, seg_arrival)
+    flight_times = _dates_and_times(stamps, dates, times, departure, arrival)
+
+    segments_df = pd.DataFrame({
+        'ItineraryID': seg['ItineraryID'],
+        'FlightID': seg['FlightID'],
+        'Duration': minutes[:n_segments],
+        'Departure': seg['Departure'],
+        'Arrival': seg['Arrival'],
+        'CarrierCode': seg['CarrierCode'],
+        'DepartureDateTime': seg_times.pop('DepartureDateTime'),
+        'ArrivalDateTime': seg_times.pop('ArrivalDateTime'),
+        'SegmentNumberOfStops': seg['SegmentNumberOfStops'],
+        'AircraftCode': seg['AircraftCode'],
+        **seg_times,
+    })
+
+    number_of_stops = np.array(flight['NumberOfStops'])
+    departure_hours = stamps[departure].hour.to_numpy()
+    flights_df = pd.DataFrame({
+        'ItineraryID': flight['ItineraryID'],
+        'Departure': flight['Departure'],
+        'Arrival': flight['Arrival'],
+        'DepartureDateTime': flight_times.pop('DepartureDateTime'),
+        'ArrivalDateTime': flight_times.pop('ArrivalDateTime'),
+        'TotalDuration': total_minutes,
+        'NumberOfStops': number_of_stops,
+        **flight_times,
+        'Departure_TimeOfDay': time_of_day(departure_hours),
+        'IsWeekend_Departure': stamps[departure].dayofweek.to_numpy() >= 5,
+        'FlightHaul': flight_haul(total_minutes),
+        'IsNonStop': number_of_stops == 0,
+        'IsOverNightFlight': is_overnight(departure_hours, stamps[arrival].hour.to_numpy(), total_minutes),
+    })
+
+    total = np.array(price['Total'], dtype=float)
+    prices_df = pd.DataFrame({
+        'ItineraryID': price['ItineraryID'],
+        'Currency': price['Currency'],
+        'Total': total,
+        'Base': np.array(price['Base'], dtype=float),
+        'FareCategory': fare_category(total),
+        'TotalZScore': (total - total.mean()) / total.std(ddof=1),
+    })
+
+    fare_itineraries = np.array(fare['ItineraryID'], dtype=np.int64)
+    fare['FlightsPerItinerary'] = np.bincount(fare_itineraries)[fare_itineraries]
+    fares_df = pd.DataFrame(fare)
+
+    return segments_df, fares_df, flights_df, prices_df
+
+
+def parse_flight_details(flight_data):
+    ''' Drop-in for the apps' parse_flight_details. '''
+    return normalize_offers(flight_data)
+
+
+if __name__ == '__main__':
+    import time
+    from lib.flight_offers.stub_server import synthetic_offers
+
+    offers = synthetic_offers('AKL', 'SYD', '2024-06-05', n_offers=250, seed=0)
+    normalize_offers(offers)
+    repeat = 20
+    start = time.perf_counter()
+    for _ in range(repeat):
+        normalize_offers(offers)
+    print(f'250 offers: {(time.perf_counter() - start) / repeat * 1000:.1f} ms')
@@ -0,0 +1,99 @@
+''' Competitor similarity scores, for one target flight or many at once.
+
+    The score is the one from the similarity notebook: +2 for the same number of stops, +2 for the
+    same cabin, 1 / 0.75 / 0.5 / 0.25 for departure times of day 0 / 1 / 2 / 3+ steps apart, the same
+    for flight hauls, and +0.5 when both are (or both aren't) overnight. Flights are encoded once as
+    small integer codes, so scoring every target against every candidate is a few broadcast
+    comparisons on a targets x candidates matrix, and the top n come from a partition instead of
+    sorting every candidate, with ties going to the earlier candidate.
+'''
+import numpy as np
+import pandas as pd
+
+from lib.flight_offers.parsing import HAULS, TIMES_OF_DAY
+
+FEATURES = ['NumberOfStops', 'Cabin', 'Departure_TimeOfDay', 'FlightHaul', 'IsOverNightFlight']
+# Score by how many steps apart two times of day (or hauls) are
+STEP_SCORES = np.array([1, 0.75, 0.5, 0.25])
+
+
+def encode_flights(flights, cabins):
+    ''' Flights (rows with FEATURES) to an int array of [stops, cabin, time of day, haul, overnight].
+        cabins is the list of cabin names both sides of a comparison are coded against.
+    '''
+    return np.column_stack([
+        flights['NumberOfStops'].to_numpy(dtype=np.int64),
+        pd.Categorical(flights['Cabin'], categories=cabins).codes,
+        pd.Categorical(flights['Departure_TimeOfDay'], categories=TIMES_OF_DAY).codes,
+        pd.Categorical(flights['FlightHaul'], categories=HAULS).codes,
+        flights['IsOverNightFlight'].to_numpy(dtype=np.int64),
+    ])
+
+
+def similarity_matrix(targets, candidates):
+    ''' Scores of every candidate for every target, a len(targets) x len(candidates) array. '''
+    cabins = list(pd.unique(np.concatenate([targets['Cabin'].to_numpy(dtype=object),
+                                            candidates['Cabin'].to_numpy(dtype=object)])))
+    a = encode_flights(targets, cabins)[:, None, :]
+    b = encode_flights(candidates, cabins)[None, :, :]
+    return (
+        2.0 * (a[..., 0] == b[..., 0])
+        + 2.0 * (a[..., 1] == b[..., 1])
+        + STEP_SCORES[np.minimum(np.abs(a[..., 2] - b[..., 2]), 3)]
+        + STEP_SCORES[np.minimum(np.abs(a[..., 3] - b[..., 3]), 3)]
+        + 0.5 * (a[..., 4] == b[..., 4])
+    )
+
+
+def top_n_indices(scores, n):
+    ''' Positions of the n best scores in each row, best first and equal scores by position, which
+        is the order of a stable sort_values(ascending=False).head(n) (the notebook's default
+        quicksort may order ties differently).
+    '''
+    n = min(n, scores.shape[1])
+    if n == 0:
+        return np.empty((len(scores), 0), dtype=np.int64)
+    # Everything above the n-th best score is in, then as many of the ties with it as there is
+    # room for, earliest first
+    kth = -np.partition(-scores, n - 1, axis=1)[:, n - 1:n]
+    above = scores > kth
+    tied = scores == kth
+    room = n - above.sum(axis=1, keepdims=True)
+    chosen = above | (tied & (np.cumsum(tied, axis=1) <= room))
+    top = np.nonzero(chosen)[1].reshape(len(scores), n)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1)
+
+
+def find_top_n_similar_flights(target_flight, all_flights, n=5):
+    ''' The n flights most similar to target_flight (a row), with a SimilarityScore column. '''
+    scores = similarity_matrix(pd.DataFrame([target_flight]), all_flights)
+    top = top_n_indices(scores, n)[0]
+    result = all_flights.iloc[top].copy()
+    result['SimilarityScore'] = scores[0, top]
+    return result
+
+
+def find_top_n_similar_flights_all(targets, candidates, n=5, chunk_size=1024):
+    ''' The n most similar candidates for every target row, stacked, with TargetIndex (the target's
+        index label), SimilarityRank (1 is the best) and SimilarityScore columns. Targets are scored
+        chunk_size at a time to bound the matrix size.
+    '''
+    positions, scores, target_rows = [], [], []
+    for start in range(0, len(targets), chunk_size):
+        chunk_scores = similarity_matrix(targets.iloc[start:start + chunk_size], candidates)
+        top = top_n_indices(chunk_scores, n)
+        positions.append(top.ravel())
+        scores.append(np.take_along_axis(chunk_scores, top, axis=1).ravel())
+        target_rows.append(np.repeat(np.arange(start, start + len(chunk_scores)), top.shape[1]))
+    if not positions:
+        return candidates.iloc[:0].assign(TargetIndex=[], SimilarityRank=[], SimilarityScore=[])
+
+    positions = np.concatenate(positions)
+    target_rows = np.concatenate(target_rows)
+    result = candidates.iloc[positions].reset_index(drop=True)
+    per_target = len(positions) // len(targets)
+    result.insert(0, 'TargetIndex', targets.index.to_numpy()[target_rows])
+    result.insert(1, 'SimilarityRank', np.tile(np.arange(1, per_target + 1), len(targets)))
+    result['SimilarityScore'] = np.concatenate(scores)
+    return result
@@ -0,0 +1,171 @@
+''' A local stand-in for the Amadeus token and Flight Offers Search endpoints.
+
+    Serves made-up offers in the API's JSON layout, with a fixed latency per call, so the client,
+    the parsers and the apps can be exercised without credentials or network:
+
+        with StubAmadeusServer(latency=0.3) as server:
+            client = FlightOffersClient('id', 'secret', base_url=server.base_url, cache=None)
+            offers = client.flight_offers_window('AKL', 'SYD', '2024-06-05', day_range=7)
+'''
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CARRIERS = ['NZ', 'QF', 'JQ', 'VA', 'EK', 'LA', 'CA']
+CABINS = ['ECONOMY', 'ECONOMY', 'ECONOMY', 'PREMIUM_ECONOMY', 'BUSINESS', 'FIRST']
+
+
+def _iso_duration(minutes):
+    hours, minutes = divmod(minutes, 60)
+    return 'PT' + (f'{hours}H' if hours else '') + (f'{minutes}M' if minutes else '')
+
+
+def synthetic_offers(origin, dest, departure_date, n_offers=50, seed=None):
+    ''' Flight offers in the Flight Offers Search response layout: nonstops and one-stop
+        connections, one traveler, fare details per segment. Not real schedules or fares.
+    '''
+    rng = random.Random(seed if seed is not None else f'{origin}{dest}{departure_date}')
+    day = datetime.strptime(departure_date, '%Y-%m-%d')
+    offers = []
+    segment_id = 0
+    for offer_id in range(1, n_offers + 1):
+        carrier = rng.choice(CARRIERS)
+        cabin = rng.choice(CABINS)
+        hub = rng.choice(['MEL', 'BNE', 'NAN', 'CHC'])
+        legs = [(origin, dest)] if rng.random() < 0.6 else [(origin, hub), (hub, dest)]
+        first_departure = departure = day + timedelta(minutes=rng.randrange(0, 24 * 60, 5))
+        segments, details = [], []
+        for leg_origin, leg_dest in legs:
+            segment_id += 1
+            minutes = rng.randrange(80, 420, 5)
+            arrival = departure + timedelta(minutes=minutes)
+            segments.append({
+                'id': str(segment_id),
+                'departure': {'iataCode': leg_origin, 'at': departure.strftime('%Y-%m-%dT%H:%M:%S')},
+                'arrival': {'iataCode': leg_dest, 'at': arrival.strftime('%Y-%m-%dT%H:%M:%S')},
+                'carrierCode': carrier,
+                'number': str(rng.randrange(100, 999)),
+                'aircraft': {'code': rng.choice(['320', '789', '77W', '738'])},
+                'duration': _iso_duration(minutes),
+                'numberOfStops': 0,
+            })
+            details.append({
+                'segmentId': str(segment_id),
+                'cabin': cabin,
+                'fareBasis': f'{cabin[0]}{rng.randrange(10, 99)}NZ',
+                'class': rng.choice('YBMHQVKLGTSN'),
+                'includedCheckedBags': {'quantity': rng.choice([0, 1, 2])},
+            })
+            departure = arrival + timedelta(minutes=rng.randrange(45, 240, 5))
+        total_minutes = int((arrival - first_departure).total_seconds() // 60)
+        base = rng.randrange(150, 2500)
+        taxes = round(base * 0.12, 2)
+        offers.append({
+            'type': 'flight-offer',
+            'id': str(offer_id),
+            'source': 'GDS',
+            'oneWay': False,
+            'numberOfBookableSeats': rng.randrange(1, 9),
+            'itineraries': [{'duration': _iso_duration(total_minutes), 'segments': segments}],
+            'price': {'currency': 'USD', 'base': f'{base:.2f}', 'total': f'{base + taxes:.2f}',
+                      'grandTotal': f'{base + taxes:.2f}'},
+            'validatingAirlineCodes': [carrier],
+            'travelerPricings': [{
+                'travelerId': '1',
+                'fareOption': 'STANDARD',
+                'travelerType': 'ADULT',
+                'price': {'currency': 'USD', 'total': f'{base + taxes:.2f}', 'base': f'{base:.2f}'},
+                'fareDetailsBySegment': details,
+            }],
+        })
+    return offers
+
+
+class StubAmadeusServer:
+    ''' Threaded HTTP server on localhost; counts calls and the most calls seen in flight at once. '''
+    def __init__(self, latency=0.0, n_offers=50, port=0):
+        self.latency = latency
+        self.n_offers = n_offers
+        self.requests_served = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # keep-alive, so connection reuse shows up
+
+            def _send(self, body, status=200):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self._send({'access_token': 'stub-token', 'expires_in': 1799, 'token_type': 'Bearer'})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/v2/shopping/flight-offers':
+                    return self._send({'errors': [{'status': 404, 'title': 'NOT FOUND'}]}, 404)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with server._lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                time.sleep(server.latency)
+                offers = synthetic_offers(query['originLocationCode'], query['destinationLocationCode'],
+                                          query['departureDate'], server.n_offers)
+                with server._lock:
+                    server.in_flight -= 1
+                    server.requests_served += 1
+                self._send({'meta': {'count': len(offers)}, 'data': offers})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    from lib.flight_offers.client import FlightOffersClient
+
+    with StubAmadeusServer(latency=0.5) as server:
+        client = FlightOffersClient('id', 'secret', base_url=server.base_url, cache=None)
+        start = time.perf_counter()
+        client.flight_offers('AKL', 'SYD', '2024-06-05')
+        print(f'one date: {time.perf_counter() - start:.2f}s')
+        start = time.perf_counter()
+        offers = client.flight_offers_window('AKL', 'SYD', '2024-06-05', day_range=7)
+        print(f'+/-7 days: {len(offers)} offers in {time.perf_counter() - start:.2f}s '
+              f'({server.requests_served} calls, {server.max_in_flight} at once)')
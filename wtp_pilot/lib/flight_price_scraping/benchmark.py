@@ -0,0 +1,101 @@
+''' Parser throughput and regression check over the fixture corpus, no browser or network needed.
+
+    python -m lib.flight_price_scraping.benchmark            check and time the corpus
+    python -m lib.flight_price_scraping.benchmark --update   re-snapshot parses and the speed baseline
+
+    Every fixture stores the parse it produced when it was last updated (legacy
+    get_info -> partition_info -> parse_columns columns and the streaming parser's records); the
+    check fails when either changes. Throughput is records per second, best of `repeat` runs, and
+    fails when it drops below `tolerance` times the baseline saved on the same machine.
+
+    The checked-in corpus is a single synthetic_page, so it catches regressions but isn't a
+    throughput figure for real pages; record some with WTP_SCRAPE_MODE=record for that.
+'''
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from lib.flight_price_scraping.fixtures import fixtures_dir, iter_fixtures
+from lib.flight_price_scraping.parser import benchmark, iter_flight_records
+from lib.flight_price_scraping.utils import get_info, partition_info, parse_columns
+
+BASELINE_FILE = 'benchmark_baseline.json'
+PAGE_COLUMNS = ['Leave Date', 'Return Date', 'Access Date'] # set by the caller or the clock, not the page
+
+
+def parse_snapshot(lines):
+    ''' What both parsers make of a page, as it round-trips through JSON. '''
+    try:
+        legacy = parse_columns(partition_info(get_info(lines)), '', '')
+        legacy = {k: v for k, v in legacy.items() if k not in PAGE_COLUMNS}
+    except Exception as e:
+        legacy = {'error': repr(e)}
+    streaming = [list(record) for record in iter_flight_records(lines)]
+    return json.loads(json.dumps({'legacy': legacy, 'streaming': streaming}))
+
+
+def check_corpus(directory=None):
+    ''' (fixture file name, parser) for every saved parse that no longer matches. '''
+    mismatches = []
+    for path, fixture in iter_fixtures(directory):
+        current = parse_snapshot(fixture['lines'])
+        expected = fixture.get('expected', {})
+        mismatches += [(path.name, name) for name in current if expected.get(name) != current[name]]
+    return mismatches
+
+
+def update_snapshots(directory=None):
+    for path, fixture in iter_fixtures(directory):
+        fixture['expected'] = parse_snapshot(fixture['lines'])
+        with open(path, 'w') as f:
+            json.dump(fixture, f, indent=1)
+
+
+def run(directory=None, repeat=5, tolerance=0.8, update=False):
+    ''' Check and time the corpus, print a report and return a process exit code. '''
+    directory = fixtures_dir() if directory is None else Path(directory)
+    baseline_path = directory / BASELINE_FILE
+    pages = [fixture['lines'] for _, fixture in iter_fixtures(directory)]
+    if not pages:
+        print(f'No fixtures in {directory}')
+        return 1
+
+    if update:
+        update_snapshots(directory)
+    mismatches = check_corpus(directory)
+    for name, parser in mismatches:
+        print(f'PARSE CHANGED  {parser:<9} {name}')
+
+    rates = benchmark(pages, repeat=repeat)
+    baseline = {}
+    if update:
+        with open(baseline_path, 'w') as f:
+            json.dump({name: rate['records_per_second'] for name, rate in rates.items()}, f, indent=1)
+    elif baseline_path.exists():
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    slow = []
+    for name, rate in rates.items():
+        line = f"{name:<9} {rate['records']:>7} records  {rate['records_per_second']:>12,.0f} records/s"
+        if name in baseline:
+            ratio = rate['records_per_second'] / baseline[name]
+            line += f'  ({ratio:.2f}x baseline)'
+            if ratio < tolerance:
+                slow.append(name)
+        print(line)
+    for name in slow:
+        print(f'SLOWER         {name} is below {tolerance:.0%} of the baseline')
+
+    print(f'{len(pages)} pages, {len(mismatches)} parse changes, {len(slow)} slowdowns')
+    return 1 if mismatches or slow else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--update', action='store_true', help='re-snapshot parses and the speed baseline')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.8)
+    args = parser.parse_args()
+    sys.exit(run(repeat=args.repeat, tolerance=args.tolerance, update=args.update))
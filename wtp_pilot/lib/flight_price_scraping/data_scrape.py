@@ -1,20 +1,37 @@
 from lib.flight_price_scraping.utils import make_url, get_results, convert_to_price_history_dataframe
+from lib.flight_price_scraping.parser import TYPED_DTYPES
+from lib.flight_price_scraping.price_store import PriceHistoryStore
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
-def scrape_data(origin, dest, date_leave, date_return, cache = False) -> dict:
+def cache_data(data, cache = True):
+    '''
+        Append scraped records to the price history store; cache is True for the default store
+        or a PriceHistoryStore
+    '''
+    store = cache if isinstance(cache, PriceHistoryStore) else PriceHistoryStore()
+    return store.append(data)
+
+def scrape_data(origin, dest, date_leave, date_return, cache = False, pool = None, typed = False, fresh = None) -> dict:
     '''
         Scraping multiple urls
+        typed = True returns a typed DataFrame (timestamps, minutes, categoricals) for either
+        cache = True (or a PriceHistoryStore) also appends the records to the price history store
+        fresh = a FreshScraper serves urls scraped recently from its store (always typed)
     '''
     if isinstance(date_leave, list) and isinstance(date_return, list):
         # Construct list of urls
         url = [make_url(origin = origin, dest = dest, date_leave = date_leave[i], date_return = date_return[i]) for i in range(len(date_leave))]
         
         # Get the data of urls
-        data = get_results(url = url, origin = origin, dest = dest, date_leave = date_leave, date_return = date_return)
+        if fresh is not None:
+            data = fresh.get_results(url = url, origin = origin, dest = dest, date_leave = date_leave, date_return = date_return, pool = pool)
+        else:
+            data = get_results(url = url, origin = origin, dest = dest, date_leave = date_leave, date_return = date_return, pool = pool, typed = typed)
 
-        # # Cache them
-        # if cache:
-        #     cache_data(data = data, origin = origin, dest = dest)
+        # Cache them
+        if cache:
+            cache_data(data = data, cache = cache)
 
         return data
 
@@ -27,14 +44,29 @@ def scrape_data(origin, dest, date_leave, date_return, cache = False) -> dict:
 
         # Get the data
         # data, price_history = get_results(url = url, origin = origin, dest = dest, date_leave = date_leave, date_return = date_return)
-        data = get_results(url = url, origin = origin, dest = dest, date_leave = date_leave, date_return = date_return)
+        if fresh is not None:
+            data = fresh.get_results(url = url, origin = origin, dest = dest, date_leave = date_leave, date_return = date_return, pool = pool)
+        else:
+            data = get_results(url = url, origin = origin, dest = dest, date_leave = date_leave, date_return = date_return, pool = pool, typed = typed)
 
-        # # Cache it
-        # if cache:
-        #     cache_data(data = data, origin = origin, dest = dest)
+        # Cache it
+        if cache:
+            cache_data(data = data, cache = cache)
         # price_history_df = convert_to_price_history_dataframe(price_history)
         
         return pd.DataFrame(data)#, price_history_df
 
     else:
-        raise TypeError('Incorrect types provided')
\ No newline at end of file
+        raise TypeError('Incorrect types provided')
+
+def scrape_requests(requests, pool, typed = False) -> pd.DataFrame:
+    '''
+        Scrape a list of (origin, dest, date_leave, date_return) requests concurrently,
+        one request per warm session of the DriverPool
+    '''
+    with ThreadPoolExecutor(max_workers = pool.size) as executor:
+        frames = list(executor.map(lambda r: pd.DataFrame(scrape_data(*r, pool = pool, typed = typed)), requests))
+    df = pd.concat(frames, ignore_index = True)
+
+    # Categoricals with different categories concatenate to object, so cast them back
+    return df.astype(TYPED_DTYPES) if typed else df
@@ -0,0 +1,105 @@
+import queue
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.options import Options
+
+FLIGHTS_HOME = 'https://www.google.com/travel/flights'
+
+
+def new_driver(headless=True):
+    ''' A Chrome session with the same settings make_url_request has always used. '''
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--window-size=1920,1080')
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.implicitly_wait(10)
+    if not headless:
+        driver.maximize_window()
+    return driver
+
+
+def set_currency(driver, currency='US Dollar'):
+    ''' Click through the currency dialog; Google keeps the choice for the rest of the session. '''
+    currency_button = driver.find_element(By.XPATH, "//span[normalize-space()='Currency']")
+    currency_button.click()
+    choice = driver.find_element(By.XPATH, f"//span[normalize-space()='{currency}']")
+    choice.click()
+    ok_button = driver.find_element(By.XPATH, "//span[normalize-space()='OK']")
+    ok_button.click()
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass # already gone
+
+
+class DriverPool:
+    ''' N warm Chrome sessions with the currency already set to USD.
+
+        Borrow one with `with pool.session() as driver:`. On return the session is reset to a blank
+        page (cookies, and so the currency, are kept). That reset is also the health check: a page
+        timeout or a missing element leaves the session warm, but a session that can't load a
+        blank page any more (crashed browser, invalid session id) is quit, and its slot gets a
+        fresh session the next time it is borrowed. A slot always goes back to the pool, even
+        when starting its new session fails.
+    '''
+    def __init__(self, size=4, headless=True, currency='US Dollar'):
+        self.size = size
+        self.headless = headless
+        self.currency = currency
+        self._drivers = queue.Queue()
+        try:
+            for _ in range(size):
+                self._drivers.put(self._warm_driver())
+        except BaseException:
+            self.close() # the sessions already started would outlive the failed pool
+            raise
+
+    def _warm_driver(self):
+        driver = new_driver(self.headless)
+        try:
+            driver.get(FLIGHTS_HOME)
+            set_currency(driver, self.currency)
+        except WebDriverException:
+            _quit(driver)
+            raise
+        return driver
+
+    def _reset(self, driver):
+        ''' driver on a blank page, or None when its session is dead. '''
+        if driver is None:
+            return None
+        try:
+            driver.get('about:blank')
+            return driver
+        except WebDriverException:
+            _quit(driver)
+            return None
+
+    @contextmanager
+    def session(self):
+        driver = self._drivers.get() # None: a slot whose session died, warmed again here
+        try:
+            if driver is None:
+                driver = self._warm_driver()
+            yield driver
+        finally:
+            self._drivers.put(self._reset(driver))
+
+    def close(self):
+        while not self._drivers.empty():
+            driver = self._drivers.get()
+            if driver is not None:
+                _quit(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
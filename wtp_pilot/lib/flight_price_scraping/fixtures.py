@@ -0,0 +1,96 @@
+''' Saved Google Flights pages, so the scraper can be parsed, timed and checked without a browser.
+
+    A fixture is one JSON file per URL holding the raw get_flight_elements lines. make_url_request
+    reads WTP_SCRAPE_MODE:
+        record  load pages as usual and also save every page to the corpus
+        replay  serve pages from the corpus, no browser or network needed
+    The corpus directory is WTP_SCRAPE_FIXTURES, defaulting to the fixtures folder next to this file.
+'''
+import hashlib
+import json
+import os
+import random
+from datetime import datetime
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+
+def scrape_mode():
+    return os.getenv('WTP_SCRAPE_MODE')
+
+
+def fixtures_dir():
+    return Path(os.getenv('WTP_SCRAPE_FIXTURES', FIXTURES_DIR))
+
+
+def fixture_path(url, directory=None):
+    directory = Path(directory) if directory is not None else fixtures_dir()
+    return directory / f"{hashlib.sha1(url.encode()).hexdigest()[:16]}.json"
+
+
+def save_fixture(url, lines, directory=None, source='google_flights'):
+    path = fixture_path(url, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'url': url, 'saved_at': datetime.now().isoformat(), 'source': source, 'lines': lines}, f, indent=1)
+    return path
+
+
+def load_fixture(url, directory=None):
+    ''' The saved page lines for url; FileNotFoundError if it was never recorded. '''
+    path = fixture_path(url, directory)
+    if not path.exists():
+        raise FileNotFoundError(f'No fixture for {url} in {path.parent} (record it with WTP_SCRAPE_MODE=record)')
+    with open(path) as f:
+        return json.load(f)['lines']
+
+
+def iter_fixtures(directory=None):
+    ''' Every fixture in the corpus as (path, fixture dict), in file name order. '''
+    directory = Path(directory) if directory is not None else fixtures_dir()
+    for path in sorted(directory.glob('*.json')):
+        with open(path) as f:
+            fixture = json.load(f)
+        if 'lines' in fixture:
+            yield path, fixture
+
+
+def synthetic_page(n_cards=40, seed=0):
+    ''' A made-up results page in the layout of get_flight_elements: nonstop, one-stop and two-stop
+        cards, the separate tickets banner and cards without emissions. Not real data; it keeps the
+        benchmark running on a machine that has never recorded a page.
+    '''
+    rng = random.Random(seed)
+    airlines = ['Air New Zealand', 'Qantas', 'Jetstar', 'Fiji Airways', 'Virgin Australia', 'Qantas, Delta']
+    hubs = ['SYD', 'MEL', 'NAN', 'BNE', 'HNL']
+
+    def clock(minutes):
+        hours, minutes = divmod(minutes % (24 * 60), 60)
+        return f"{(hours - 1) % 12 + 1}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+
+    lines = ['Skip to main content', 'Flights', 'Round trip', '1', 'Economy', 'Auckland', 'Los Angeles',
+             'Sort by:', 'Ranked based on price and convenience', 'Prices include required taxes + fees for 1 adult.']
+    for _ in range(n_cards):
+        depart = rng.randrange(24 * 60)
+        stops = rng.choice([0, 0, 1, 1, 2])
+        duration = 12 * 60 + rng.randrange(0, 12 * 60, 5)
+        arrive = depart + duration
+        lines += [clock(depart), ' – ', clock(arrive) + (f'+{arrive // (24 * 60)}' if arrive >= 24 * 60 else '')]
+        if rng.random() < 0.1:
+            lines += ['Separate tickets booked together']
+        lines += [rng.choice(airlines), f'{duration // 60} hr {duration % 60} min' if duration % 60 else f'{duration // 60} hr',
+                  'AKL–LAX', 'Nonstop' if stops == 0 else f"{stops} stop{'s' if stops > 1 else ''}"]
+        if stops == 1:
+            layover = rng.randrange(45, 300, 5)
+            lines += [f"{layover // 60} hr {layover % 60} min {rng.choice(hubs)}" if layover >= 60 else f'{layover} min {rng.choice(hubs)}']
+        elif stops > 1:
+            lines += [', '.join(rng.sample(hubs, stops))]
+        if rng.random() < 0.15:
+            lines += ['–']
+        else:
+            diff = rng.randrange(-30, 40)
+            lines += [f'{rng.randrange(500, 2000):,} kg CO2e', 'Avg emissions' if abs(diff) < 3 else f'{diff:+d}% emissions']
+        lines += [f'${rng.randrange(700, 4000):,}', 'round trip']
+    lines += ['Language', 'English (United States)', 'Location', 'New Zealand', 'Currency', 'USD']
+    return lines
@@ -0,0 +1,131 @@
+''' Skip re-scraping results pages that are still fresh.
+
+    FreshnessIndex keeps url -> (last scraped, content hash, access date) in a JSON file next to
+    the price history store. How long a page stays fresh depends on how far out the flight is:
+    fares close to departure move quickly, months out they barely change. A fresh url is served
+    from the PriceHistoryStore records of its last scrape (stored under the page hash as their
+    scrape_id) instead of a browser.
+'''
+import hashlib
+import json
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from lib.flight_price_scraping.parser import iter_flight_records, records_to_frame, TYPED_DTYPES
+from lib.flight_price_scraping.price_store import PriceHistoryStore
+from lib.flight_price_scraping.utils import make_url_request
+
+# (days to departure up to, time to live); the first row that covers the DTD applies
+DEFAULT_TTLS = [
+    (3, timedelta(hours=1)),
+    (14, timedelta(hours=6)),
+    (60, timedelta(hours=24)),
+    (float('inf'), timedelta(days=3)),
+]
+
+
+def content_hash(lines):
+    return hashlib.sha1('\n'.join(lines).encode()).hexdigest()
+
+
+class FreshnessIndex:
+    def __init__(self, path, ttls=DEFAULT_TTLS):
+        self.path = Path(path)
+        self.ttls = ttls
+        self._lock = threading.Lock()
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def ttl(self, date_leave, now=None):
+        now = now or datetime.now()
+        dtd = (pd.Timestamp(date_leave).date() - now.date()).days
+        return next(ttl for max_dtd, ttl in self.ttls if dtd <= max_dtd)
+
+    def is_fresh(self, url, date_leave, now=None):
+        now = now or datetime.now()
+        entry = self.entries.get(url)
+        return entry is not None and now - datetime.fromisoformat(entry['scraped_at']) < self.ttl(date_leave, now)
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def changed(self, url, digest, access_date):
+        ''' True when url's page (by content hash) or access date differs from its last scrape. '''
+        previous = self.entries.get(url)
+        return previous is None or previous['hash'] != digest or previous['access_date'] != access_date
+
+    def record(self, url, digest, access_date, now=None):
+        ''' Note a scrape of url with page hash digest. '''
+        with self._lock:
+            self.entries[url] = {'scraped_at': (now or datetime.now()).isoformat(), 'hash': digest,
+                                 'access_date': access_date}
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f)
+
+
+class FreshScraper:
+    ''' get_results in front of a price history store: fresh urls come from the store, stale ones
+        are scraped, stored and indexed. Results are typed frames (parser.typed_frame).
+    '''
+    def __init__(self, store=None, index=None, pool=None):
+        self.store = store or PriceHistoryStore()
+        # pyarrow.dataset skips files starting with '_', so the index can live in the store folder
+        self.index = index or FreshnessIndex(self.store.root / '_freshness.json')
+        self.pool = pool
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        print(f'{self.hits} fresh, {self.misses} scraped, hit rate {self.hit_rate:.0%}')
+
+    def _from_store(self, origin, dest, date_leave, date_return, entry):
+        df = self.store.query(origin, dest, date_leave=date_leave, access_from=entry['access_date'],
+                              access_to=entry['access_date'], scrape_id=entry['hash'])
+        return df[df['Return Date'] == pd.Timestamp(date_return)]
+
+    def _scraped(self, url, lines, origin, dest, date_leave, date_return):
+        access_date = date.today().strftime('%Y-%m-%d')
+        df = records_to_frame(iter_flight_records(lines), date_leave, date_return, access_date)
+        if len(df): # a timed out page, or one nothing could be parsed from, is retried next time
+            digest = content_hash(lines)
+            if self.index.changed(url, digest, access_date):
+                self.store.append(df, scrape_id=digest)
+            # Only once the records are stored, so a failed append is scraped again
+            self.index.record(url, digest, access_date)
+        return df
+
+    def get_results(self, url, origin, dest, date_leave, date_return, pool=None):
+        ''' Same arguments as utils.get_results: one url and dates, or lists of them.
+            Stale urls are loaded on pool, or the scraper's own pool when none is given.
+        '''
+        if isinstance(url, str):
+            url, date_leave, date_return = [url], [date_leave], [date_return]
+
+        frames = [None] * len(url)
+        stale = []
+        for i, (u, leave, ret) in enumerate(zip(url, date_leave, date_return)):
+            if self.index.is_fresh(u, leave):
+                frames[i] = self._from_store(origin, dest, leave, ret, self.index.get(u))
+                self.hits += 1
+            else:
+                stale.append(i)
+        self.misses += len(stale)
+
+        if stale:
+            stale_urls = [url[i] for i in stale]
+            pages = make_url_request(stale_urls[0] if len(stale) == 1 else stale_urls, pool=pool or self.pool)
+            pages = [pages] if len(stale) == 1 else pages
+            for i, lines in zip(stale, pages):
+                frames[i] = self._scraped(url[i], lines, origin, dest, date_leave[i], date_return[i])
+
+        return pd.concat(frames, ignore_index=True).astype(TYPED_DTYPES)
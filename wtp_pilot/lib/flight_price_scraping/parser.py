@@ -0,0 +1,227 @@
+''' Single-pass parser for the Google Flights results page text.
+
+    Works on any iterable of page lines (get_flight_elements output, a saved dump read line by line)
+    and yields one FlightRecord per flight card. Lines are looked at once: everything before
+    'Sort by:' is skipped, noise lines are dropped as they stream past, and a card runs from
+    a departure time to the next card's departure time. Each card is then read with one precompiled
+    regex, so the 'Separate tickets booked together' banner, layover lines and missing emissions
+    don't need fixed offsets. Unlike partition_info, the last card on the page is not dropped.
+
+    It is about as fast as the legacy get_info -> partition_info -> parse_columns chain (within
+    noise either way on the synthetic pages in fixtures.py, the only corpus so far); what it buys is
+    typed records and cards the fixed offsets misread, not throughput.
+'''
+import re
+import time
+from datetime import date
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+START_LINE = 'Sort by:'
+SEPARATE_TICKETS = 'Separate tickets booked together'
+TIME = re.compile(r'^\d{1,2}:\d{2}\s?[AP]M(?:\+(\d+))?$')
+
+# One flight card, its lines joined with newlines. The layover line is only there when the stops
+# line gives a number of stops, and the emissions line only when CO2 isn't shown as '–'.
+CARD = re.compile(r'''
+    (?P<depart_time>[^\n]+)\n
+    (?P<arrival_time>[^\n+]*(?:\+(?P<arrival_day_offset>\d+))?)\n
+    (?:(?P<separate_tickets>Separate\ tickets\ booked\ together)[^\n]*\n)?
+    (?P<airline>[^\n]+)\n
+    (?:(?P<travel_hours>\d+)\ hr)?\ ?(?:(?P<travel_minutes>\d+)\ min)?[^\n]*\n
+    (?P<origin>[^\n–]*)–(?P<destination>[^\n]*)\n
+    (?:Nonstop|(?P<num_stops>\d+)\ stops?)[^\n]*\n
+    (?(num_stops)
+        (?:(?P<layover_hours>\d+)\ hr)?\ ?(?:(?P<layover_minutes>\d+)\ min)?\ ?(?P<stop_locations>[^\n]*)\n
+    )
+    (?:–|(?P<co2_kg>[\d,.]+)\ kg[^\n]*\n(?:Avg\ emissions|(?P<emission_diff_pct>[+-]?\d+)%[^\n]*))\n
+    [^\d\n]*(?P<price>[\d,]+(?:\.\d+)?)[^\n]*\n
+    (?P<trip_type>[^\n]+)
+''', re.VERBOSE)
+
+
+class FlightRecord(NamedTuple):
+    depart_time: str
+    arrival_time: str
+    arrival_day_offset: int
+    airline: str
+    travel_minutes: int
+    origin: str
+    destination: str
+    num_stops: int
+    layover_minutes: Optional[int]
+    stop_locations: tuple
+    co2_kg: Optional[float]
+    emission_diff_pct: Optional[int]
+    price: float
+    trip_type: str
+    separate_tickets: bool
+
+
+def _minutes(hours, minutes):
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def parse_card(card):
+    ''' One flight card (its lines, departure time first) as a FlightRecord, or None if it doesn't
+        read as one (e.g. the page footer).
+    '''
+    match = CARD.match('\n'.join(card))
+    if match is None:
+        return None
+    (depart_time, arrival_time, arrival_day_offset, separate_tickets, airline, travel_hours, travel_minutes,
+     origin, destination, num_stops, layover_hours, layover_minutes, stop_locations, co2_kg,
+     emission_diff_pct, price, trip_type) = match.groups()
+    num_stops = int(num_stops or 0)
+    return FlightRecord(
+        depart_time,
+        arrival_time,
+        int(arrival_day_offset or 0),
+        airline,
+        _minutes(travel_hours, travel_minutes),
+        origin,
+        destination,
+        num_stops,
+        _minutes(layover_hours, layover_minutes) if num_stops == 1 else None,
+        tuple(s.strip() for s in stop_locations.split(',')) if num_stops else (),
+        float(co2_kg.replace(',', '')) if co2_kg else None,
+        int(emission_diff_pct or 0) if co2_kg else None,
+        float(price.replace(',', '')),
+        trip_type,
+        separate_tickets is not None,
+    )
+
+
+def iter_cards(lines):
+    ''' Group the page lines after 'Sort by:' into flight cards, in one pass. '''
+    lines = iter(lines)
+    for line in lines:
+        if line == START_LINE:
+            break
+
+    card = []
+    for line in lines:
+        # The lines get_info leaves out, except that 'together' no longer counts as 'other' (that
+        # threw away the separate tickets banner). Substring checks on one lower() are a lot cheaper
+        # than a case-insensitive regex search, and this runs for every line of the page.
+        low = line.lower()
+        if 'price' in low or ' – ' in low or ('other' in low and 'together' not in low):
+            continue
+        # Cards start at a departure time; a time after the departure and arrival times starts the next card
+        if (line[-1:] == 'M' or line[-2:-1] == '+') and len(card) != 1 and TIME.match(line):
+            if card:
+                yield card
+            card = [line]
+        elif card:
+            card.append(line)
+    if card:
+        yield card
+
+
+def iter_flight_records(lines):
+    ''' FlightRecords for every card on the page, skipping anything that doesn't parse. '''
+    for card in iter_cards(lines):
+        record = parse_card(card)
+        if record is not None:
+            yield record
+
+
+def records_to_columns(records, date_leave, date_return, access_date=None):
+    ''' The parse_columns layout (same column names) from FlightRecords.
+        Travel and layover times are in minutes and Stop Location is a comma separated string.
+    '''
+    records = list(records)
+    access_date = access_date or date.today().strftime('%Y-%m-%d')
+    return {
+        'Leave Date' : [date_leave]*len(records),
+        'Return Date' : [date_return]*len(records),
+        'Depart Time (Leg 1)' : [r.depart_time for r in records],
+        'Arrival Time (Leg 1)' : [r.arrival_time for r in records],
+        'Airline(s)' : [r.airline for r in records],
+        'Travel Time' : [r.travel_minutes for r in records],
+        'Origin' : [r.origin for r in records],
+        'Destination' : [r.destination for r in records],
+        'Num Stops' : [r.num_stops for r in records],
+        'Layover Time' : [r.layover_minutes for r in records],
+        'Stop Location' : [', '.join(r.stop_locations) or None for r in records],
+        'CO2 Emission' : [r.co2_kg for r in records],
+        'Emission Avg Diff (%)' : [r.emission_diff_pct for r in records],
+        'Price ($)' : [r.price for r in records],
+        'Trip Type' : [r.trip_type for r in records],
+        'Access Date' : [access_date]*len(records)
+    }
+
+
+# The typed layout of records_to_columns; every dtype has a direct Arrow equivalent
+# (timestamp, dictionary, nullable ints), so frames go to Parquet/Arrow without object columns.
+DATE_COLUMNS = ['Leave Date', 'Return Date', 'Access Date']
+TIME_COLUMNS = ['Depart Time (Leg 1)', 'Arrival Time (Leg 1)']
+TYPED_DTYPES = {
+    'Airline(s)' : 'category',
+    'Travel Time' : 'int16',
+    'Origin' : 'category',
+    'Destination' : 'category',
+    'Num Stops' : 'int8',
+    'Layover Time' : 'Int16',
+    'Stop Location' : 'category',
+    'CO2 Emission' : 'float32',
+    'Emission Avg Diff (%)' : 'Int16',
+    'Price ($)' : 'float64',
+    'Trip Type' : 'category',
+}
+
+
+def typed_frame(df):
+    ''' Cast records_to_columns output (a dict, or a DataFrame of one or more pages) to typed columns:
+        dates and leg 1 departure/arrival as timestamps on the leave date (arrival day offset
+        applied), minutes as small ints, airlines, airports and trip type as categoricals.
+    '''
+    df = pd.DataFrame(df)
+    for column in DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column])
+    for column in TIME_COLUMNS:
+        clock = df[column].astype(str).str.extract(r'^(\d{1,2}):(\d{2})\s?([AP])M(?:\+(\d+))?$')
+        hours = clock[0].astype(float) % 12 + np.where(clock[2] == 'P', 12, 0)
+        minutes = hours * 60 + clock[1].astype(float) + clock[3].astype(float).fillna(0) * 24 * 60
+        df[column] = df['Leave Date'] + pd.to_timedelta(minutes, unit='min')
+    return df.astype(TYPED_DTYPES)
+
+
+def records_to_frame(records, date_leave, date_return, access_date=None):
+    ''' FlightRecords as a typed DataFrame (see typed_frame). '''
+    return typed_frame(records_to_columns(records, date_leave, date_return, access_date))
+
+def benchmark(pages, repeat=5):
+    ''' Records per second of the legacy get_info -> partition_info -> parse_columns chain and of
+        iter_flight_records, over a list of pages (each a list of lines). Best of `repeat` runs.
+        Only pages recorded from Google Flights say anything about real throughput.
+    '''
+    from lib.flight_price_scraping.utils import get_info, partition_info, parse_columns
+
+    def legacy():
+        return sum(len(parse_columns(partition_info(get_info(page)), '', '')['Price ($)']) for page in pages)
+
+    def streaming():
+        return sum(1 for page in pages for _ in iter_flight_records(page))
+
+    rates = {}
+    for name, run in [('legacy', legacy), ('streaming', streaming)]:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            n_records = run()
+            best = min(best, time.perf_counter() - start)
+        rates[name] = {'records': n_records, 'seconds': best, 'records_per_second': n_records / best}
+    return rates
+
+
+if __name__ == '__main__':
+    import sys
+    from pathlib import Path
+
+    # python -m lib.flight_price_scraping.parser <dump.txt> [...]
+    pages = [Path(p).read_text().split('\n') for p in sys.argv[1:]]
+    for name, rate in benchmark(pages).items():
+        print(f"{name}: {rate['records']} records, {rate['records_per_second']:,.0f} records/s")
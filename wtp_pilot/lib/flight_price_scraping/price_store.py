@@ -0,0 +1,147 @@
+''' Append-only price history of scraped fares, as Parquet partitioned by route and access date.
+
+    <root>/route=AKL-SYD/access_date=2024-06-01/part-<id>.parquet
+
+    Every append writes the typed scrape records (parser.typed_frame) to new files under their
+    partitions, leaving out records already stored in the same partition, so re-scraping a URL on
+    the same day doesn't duplicate its fares. An append can carry a scrape_id (the page hash) so
+    the records of one scrape can be read back on their own; a fare seen again by a later scrape
+    is then stored once per scrape, and queries without a scrape_id still see it once. Queries go
+    through pyarrow.dataset: the route and access date filters only open the matching partition
+    folders, and the leave date filter is pushed down to the Parquet row groups.
+'''
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from lib.flight_price_scraping.parser import TYPED_DTYPES, typed_frame
+
+PARTITIONING = ds.partitioning(pa.schema([('route', pa.string()), ('access_date', pa.string())]), flavor='hive')
+# A record is the same fare if everything but the day it was seen matches
+RECORD_COLUMNS = ['Leave Date', 'Return Date', 'Depart Time (Leg 1)', 'Arrival Time (Leg 1)', 'Airline(s)',
+                  'Travel Time', 'Origin', 'Destination', 'Num Stops', 'Layover Time', 'Stop Location',
+                  'CO2 Emission', 'Emission Avg Diff (%)', 'Price ($)', 'Trip Type']
+
+
+def route_key(origin, dest):
+    return f'{origin}-{dest}'
+
+
+def record_hashes(df):
+    return pd.util.hash_pandas_object(df[RECORD_COLUMNS].astype(str), index=False).to_numpy()
+
+
+class PriceHistoryStore:
+    def __init__(self, root=Path.home() / '.cache' / 'wtp_pilot' / 'price_history'):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _partition_dir(self, route, access_date):
+        return self.root / f'route={route}' / f'access_date={access_date}'
+
+    def append(self, data, scrape_id=None):
+        ''' Store scrape records (a typed frame, or records_to_columns output). Returns the number of
+            new records written. With a scrape_id, records are only left out when that same scrape
+            already stored them.
+        '''
+        df = pd.DataFrame(data)
+        if not pd.api.types.is_datetime64_any_dtype(df['Depart Time (Leg 1)']):
+            df = typed_frame(df)
+        if df.empty:
+            return 0
+        df = df.assign(record_hash=record_hashes(df), scrape_id=pd.Series(scrape_id, index=df.index, dtype=object))
+        df = df.drop_duplicates('record_hash')
+        routes = df['Origin'].astype(str) + '-' + df['Destination'].astype(str)
+        access_dates = df['Access Date'].dt.strftime('%Y-%m-%d')
+
+        written = 0
+        for (route, access_date), part in df.groupby([routes, access_dates], sort=False):
+            directory = self._partition_dir(route, access_date)
+            if directory.exists():
+                stored = pq.read_table(directory, columns=['record_hash', 'scrape_id']).to_pandas()
+                if scrape_id is not None:
+                    stored = stored[stored['scrape_id'] == scrape_id]
+                part = part[~part['record_hash'].isin(stored['record_hash'])]
+            if part.empty:
+                continue
+            directory.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            table = table.set_column(table.schema.get_field_index('scrape_id'), 'scrape_id',
+                                     table['scrape_id'].cast(pa.string()))
+            pq.write_table(table, directory / f'part-{uuid.uuid4().hex}.parquet')
+            written += len(part)
+        return written
+
+    def dataset(self):
+        return ds.dataset(self.root, format='parquet', partitioning=PARTITIONING)
+
+    def query(self, origin=None, dest=None, date_leave=None, access_from=None, access_to=None, columns=None,
+              scrape_id=None):
+        ''' Stored records matching every filter given, as a typed frame.
+            Dates are 'YYYY-MM-DD' strings or anything pd.Timestamp accepts. scrape_id gives only
+            the records of that scrape; without it a fare stored by several scrapes of the same
+            day comes back once.
+        '''
+        dataset = self.dataset()
+        if not dataset.files:
+            return pd.DataFrame(columns=columns or RECORD_COLUMNS + ['Access Date'])
+
+        conditions = []
+        if origin is not None and dest is not None:
+            conditions.append(ds.field('route') == route_key(origin, dest))
+        elif origin is not None or dest is not None:
+            column = 'Origin' if origin is not None else 'Destination'
+            conditions.append(ds.field(column) == (origin or dest))
+        if access_from is not None:
+            conditions.append(ds.field('access_date') >= pd.Timestamp(access_from).strftime('%Y-%m-%d'))
+        if access_to is not None:
+            conditions.append(ds.field('access_date') <= pd.Timestamp(access_to).strftime('%Y-%m-%d'))
+        if date_leave is not None:
+            conditions.append(ds.field('Leave Date') == pa.scalar(pd.Timestamp(date_leave), pa.timestamp('us')))
+        if scrape_id is not None:
+            conditions.append(ds.field('scrape_id') == scrape_id)
+
+        condition = None
+        for c in conditions:
+            condition = c if condition is None else condition & c
+        # The same day's duplicates are found by access date and record hash
+        read = None if columns is None else list(dict.fromkeys(list(columns) + ['access_date', 'record_hash']))
+        table = dataset.to_table(columns=read, filter=condition)
+        if scrape_id is None:
+            keys = table.select(['access_date', 'record_hash']).to_pandas()
+            table = table.take(np.flatnonzero(~keys.duplicated().to_numpy()))
+        table = table.select(columns) if columns is not None else table
+        df = table.drop_columns([c for c in ['route', 'access_date', 'record_hash', 'scrape_id']
+                                 if c in table.column_names]).to_pandas()
+        return df.astype({c: t for c, t in TYPED_DTYPES.items() if c in df})
+
+    def price_history(self, origin, dest, date_leave):
+        ''' Cheapest fare seen on each access date for one route and leave date, in the layout of
+            convert_to_price_history_dataframe ('days ago' is the date the fare was seen).
+        '''
+        df = self.query(origin, dest, date_leave=date_leave, columns=['Access Date', 'Price ($)'])
+        history = df.groupby('Access Date')['Price ($)'].min()
+        return pd.DataFrame({'days ago': history.index.date, 'price $': history.to_numpy()})
+
+
+if __name__ == '__main__':
+    import time
+    from lib.flight_price_scraping.fixtures import synthetic_page
+    from lib.flight_price_scraping.parser import iter_flight_records, records_to_frame
+
+    store = PriceHistoryStore('/tmp/wtp_price_history')
+    for day in range(30):
+        access_date = (date(2024, 5, 1) + timedelta(days=day)).isoformat()
+        for leave in ['2024-06-05', '2024-06-12']:
+            page = synthetic_page(100, seed=day)
+            store.append(records_to_frame(iter_flight_records(page), leave, '2024-06-20', access_date))
+    print(f'{len(store.dataset().files)} files')
+    start = time.perf_counter()
+    print(store.price_history('AKL', 'LAX', '2024-06-05').tail())
+    print(f'{time.perf_counter() - start:.3f}s')
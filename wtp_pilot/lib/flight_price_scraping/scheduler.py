@@ -0,0 +1,146 @@
+''' Asyncio scheduler for refreshing many (origin, dest, date_leave, date_return) scrapes.
+
+    The scrapes themselves are still the blocking get_results calls; the scheduler runs them on a
+    thread executor and decides when each may start:
+        - at most max_concurrency pages in flight overall and per_host per host,
+        - at most one page per route (origin, dest) every route_interval seconds,
+        - a failed page is retried with exponential backoff, up to max_retries times, and then
+          written to a dead-letter JSON-lines file so it can be re-queued later.
+    While it runs it prints completed/failed/in-flight counts and the p50/p95 page latency.
+'''
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+from lib.flight_price_scraping.utils import make_url, get_results
+
+
+class ScrapeScheduler:
+    ''' Run scrape jobs concurrently. A job is (origin, dest, date_leave, date_return).
+
+        pool: an optional DriverPool; size max_concurrency to match the pool so no page waits on a session.
+    '''
+    def __init__(self, pool=None, max_concurrency=4, per_host=2, route_interval=0.0, max_retries=3,
+                 backoff=2.0, dead_letter_path='scrape_dead_letter.jsonl', report_every=10.0):
+        self.pool = pool
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.route_interval = route_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.dead_letter_path = dead_letter_path
+        self.report_every = report_every
+
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.latencies = []
+
+    def stats(self):
+        p50, p95 = np.percentile(self.latencies, [50, 95]) if self.latencies else (np.nan, np.nan)
+        return {'completed': self.completed, 'failed': self.failed, 'in_flight': self.in_flight,
+                'p50_latency': p50, 'p95_latency': p95}
+
+    def _report(self):
+        s = self.stats()
+        print(f"completed {s['completed']}, failed {s['failed']}, in flight {s['in_flight']}, "
+              f"latency p50 {s['p50_latency']:.1f}s p95 {s['p95_latency']:.1f}s")
+
+    async def _reporter(self):
+        while True:
+            await asyncio.sleep(self.report_every)
+            self._report()
+
+    async def _wait_for_route(self, route):
+        ''' Space out page starts on the same route by route_interval seconds. '''
+        async with self._route_locks.setdefault(route, asyncio.Lock()):
+            loop = asyncio.get_running_loop()
+            wait = self._route_next.get(route, 0.0) - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._route_next[route] = loop.time() + self.route_interval
+
+    def _dead_letter(self, job, error, attempts):
+        origin, dest, date_leave, date_return = job
+        record = {'origin': origin, 'dest': dest, 'date_leave': date_leave, 'date_return': date_return,
+                  'error': repr(error), 'attempts': attempts, 'failed_at': datetime.now().isoformat()}
+        with open(self.dead_letter_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    async def _run_job(self, job, executor):
+        origin, dest, date_leave, date_return = job
+        url = make_url(origin=origin, dest=dest, date_leave=date_leave, date_return=date_return)
+        host_limit = self._host_limits.setdefault(urlparse(url).netloc, asyncio.Semaphore(self.per_host))
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_route((origin, dest))
+            async with self._global_limit, host_limit:
+                self.in_flight += 1
+                start = time.perf_counter()
+                try:
+                    data = await loop.run_in_executor(
+                        executor, lambda: get_results(url, origin, dest, date_leave, date_return, pool=self.pool)
+                    )
+                except Exception as e:
+                    error = e
+                else:
+                    self.latencies.append(time.perf_counter() - start)
+                    self.completed += 1
+                    return pd.DataFrame(data)
+                finally:
+                    self.in_flight -= 1
+
+            if attempt < self.max_retries:
+                # Full jitter so retries of pages that failed together don't hit the site together
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+        self.failed += 1
+        self._dead_letter(job, error, self.max_retries + 1)
+        return None
+
+    async def run_async(self, jobs):
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        self._host_limits = {}
+        self._route_locks = {}
+        self._route_next = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            reporter = asyncio.create_task(self._reporter())
+            try:
+                frames = await asyncio.gather(*(self._run_job(job, executor) for job in jobs))
+            finally:
+                reporter.cancel()
+        self._report()
+        frames = [f for f in frames if f is not None]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def run(self, jobs):
+        ''' Scrape every job and return the successful results as one DataFrame. '''
+        return asyncio.run(self.run_async(list(jobs)))
+
+
+def load_dead_letters(path='scrape_dead_letter.jsonl'):
+    ''' Jobs from a dead-letter file, ready to pass back to ScrapeScheduler.run. '''
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [(r['origin'], r['dest'], r['date_leave'], r['date_return']) for r in records]
+
+
+if __name__ == '__main__':
+    from datetime import date, timedelta
+    from lib.flight_price_scraping.driver_pool import DriverPool
+
+    routes = [('AKL', 'SYD'), ('AKL', 'MEL'), ('WLG', 'SYD'), ('CHC', 'BNE')]
+    start = date.today() + timedelta(days=7)
+    jobs = [(origin, dest, str(start + timedelta(days=d)), str(start + timedelta(days=d + 7)))
+            for origin, dest in routes for d in range(0, 30, 7)]
+    with DriverPool(size=4) as pool:
+        df = ScrapeScheduler(pool, max_concurrency=4, per_host=4, route_interval=5.0).run(jobs)
+    print(df.head())
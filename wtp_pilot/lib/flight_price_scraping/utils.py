@@ -1,13 +1,16 @@
-from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
-import tqdm
+from tqdm import tqdm
 import time
 import pandas as pd
-from datetime import date, timedelta
+from datetime import date
+
+from lib.flight_price_scraping.driver_pool import new_driver, set_currency
+from lib.flight_price_scraping.parser import iter_flight_records, records_to_columns, typed_frame
+from lib.flight_price_scraping.fixtures import scrape_mode, load_fixture, save_fixture
 
 
 def make_url(origin : str, dest : str, date_leave : str, date_return : str) -> str:
@@ -137,105 +140,166 @@ def parse_columns(grouped, date_leave, date_return):
         'Trip Type' : trip_type,
         'Access Date' : access_date
     }
-def get_results(url, origin, dest, date_leave, date_return):
+def get_results(url, origin, dest, date_leave, date_return, pool = None, typed = False):
     '''
         Return results for single url
+        typed = True returns a typed DataFrame (parser.typed_frame) instead of lists of columns
     '''
     if isinstance(url, str) and isinstance(date_leave, str) and isinstance(date_return, str):
 
     
         # Make URL request
         # results, price_history = make_url_request(url = url)
-        results = make_url_request(url = url)
+        results = make_url_request(url = url, pool = pool)
 
-        # Data cleaning
-        flight_info = get_info(results) # First, get relevant results
-        partition = partition_info(flight_info) # Partition list into "flights"
+        # Data cleaning: one pass over the page lines, one record per flight card
+        columns = records_to_columns(iter_flight_records(results), date_leave, date_return)# , price_history
+        return typed_frame(columns) if typed else columns
 
-        return parse_columns(partition, date_leave, date_return)# , price_history # "Transpose" to data frame
+    '''
+        Return results for a list of urls, as one set of columns
+    '''
+    if isinstance(url, list):
+        columns = {}
+        for results, leave, ret in zip(make_url_request(url = url, pool = pool), date_leave, date_return):
+            parsed = records_to_columns(iter_flight_records(results), leave, ret)
+            for k, v in parsed.items():
+                columns.setdefault(k, []).extend(v)
+        return typed_frame(columns) if typed else columns
 
 def get_flight_elements(d) -> list:
     return d.find_element(by = By.XPATH, value = '//body[@id = "yDmH0d"]').text.split('\n')
 
+# All aria-labels of the price history chart in one round trip, instead of two get_attribute calls per <g>
+ARIA_LABELS_SCRIPT = """
+return Array.from(document.getElementsByTagName('g'), g => g.getAttribute('aria-label'))
+    .filter(label => label !== null);
+"""
+
 def find_flight_history_price(d):
-    # labels = d.find_elements(By.TAG_NAME, 'g')
     WebDriverWait(d, timeout = 15).until(EC.presence_of_element_located((By.XPATH, "//*[name()='path' and contains(@class,'yLHjwb-ppH')]")))
-    labels = d.find_elements(By.TAG_NAME, 'g')
-    texts = [l.get_attribute("aria-label") for l in labels if l.get_attribute("aria-label") is not None]
-    return texts
+    return d.execute_script(ARIA_LABELS_SCRIPT)
+
+def fetch_price_history(driver, url = None, timeout = 15):
+    '''
+        Price history of a results page as a DataFrame; opens url first when given
+    '''
+    if url is not None:
+        driver.get(url)
+    WebDriverWait(driver, timeout = timeout).until(EC.presence_of_element_located((By.XPATH, "//*[name()='path' and contains(@class,'yLHjwb-ppH')]")))
+    return convert_to_price_history_dataframe(driver.execute_script(ARIA_LABELS_SCRIPT))
 
 def convert_to_price_history_dataframe(prices):
-    tday = date.today()
-    df = pd.DataFrame([l.split(' - ') for l in prices], columns=['days ago', 'price $'])
-    df['days ago'] = df['days ago'].str.extract('(\d+)').fillna(0)
-    df["days ago"] = df["days ago"].apply(lambda x: tday-timedelta(days=int(x)))
-    df['price $'] = df['price $'].str.extract('(\d+)').fillna(0)
+    '''
+        Labels like '12 days ago - $1,234' to the date seen ('days ago', a date) and the price
+    '''
+    labels = pd.Series(prices, dtype = object).str.split(' - ', n = 1, expand = True).reindex(columns = [0, 1]).astype(object).fillna('')
+    days_ago = labels[0].str.extract(r'(\d+)', expand = False).fillna(0).astype(int)
+    df = pd.DataFrame({
+        'days ago' : (pd.Timestamp(date.today()) - pd.to_timedelta(days_ago, unit = 'D')).dt.date,
+        'price $' : labels[1].str.replace(',', '').str.extract(r'(\d+)', expand = False).fillna(0).astype(int),
+    })
     return df
 
-def make_url_request(url):
+def load_flight_results(driver, url, timeout = 10):
+    '''
+        Open a results page in an existing session and return the page lines
+    '''
+    driver.get(url)
+    return expand_flight_results(driver, timeout = timeout)
+
+def expand_flight_results(driver, timeout = 10):
+    '''
+        Expand "more flights" on the open results page and return the page lines
+    '''
+    more_flights = driver.find_element(By.XPATH, "//div[@class='zISZ5c QB2Jof']") 
+    more_flights.click()
+
+    # Waiting and initial XPATH cleaning
+    # WebDriverWait(driver, timeout = 10).until(lambda d: len(get_flight_elements(d)) > 1000)
+    WebDriverWait(driver, timeout = timeout).until(
+        EC.text_to_be_present_in_element(
+        (By.XPATH, "//span[@class='bEfgkb ']"), # Element Filtration
+        "Hide"# The Expected Text
+        )
+    )
+
+    # price_history = driver.find_element(By.XPATH, "//div[@class='GY6iob AdWm1c I3j9Le']") #"//div[@class='iy3L1b']"
+    # 
+    # price_history = WebDriverWait(driver, timeout = 20).until(EC.element_to_be_clickable(
+    #         (By.XPATH, "//div[@class='vx1PSc']")
+    #         )).click()  
+    # HISTORICAL PRICES
+    # # Wait for the button element to be clickable
+    # button = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.XPATH, "//button[@aria-label='View price history']")))
+    # button = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.CSS_SELECTOR, ".VfPpkd-LgbsSe"))) 
+    # # Click on the button
+    # button.click()
+
+    return get_flight_elements(driver)
+    # price_history = find_flight_history_price(driver)
+
+def make_url_request(url, pool = None):
+    '''
+        Scrape one url or a list of urls.
+        With a DriverPool the pages are loaded in borrowed warm sessions (currency already set);
+        without one a session is started, set to USD, used and quit as before.
+        WTP_SCRAPE_MODE=replay serves the pages from the fixture corpus instead and
+        WTP_SCRAPE_MODE=record saves every page loaded to it (see fixtures.py).
+    '''
+    mode = scrape_mode()
+    if mode == 'replay':
+        return load_fixture(url) if isinstance(url, str) else [load_fixture(u) for u in url]
+
+    results = _load_url_request(url, pool = pool)
+
+    if mode == 'record':
+        if isinstance(url, str):
+            save_fixture(url, results)
+        else:
+            for u, r in zip(url, results):
+                if r: # a timed out page has nothing worth keeping
+                    save_fixture(u, r)
+    return results
+
+def _load_url_request(url, pool = None):
     if isinstance(url, str):
+        if pool is not None:
+            with pool.session() as driver:
+                return load_flight_results(driver, url)
+
         # Instantiate driver and get raw data
-         # seconds
-        # Set path to chromedriver executable
-        chrome_options = Options()
-        chrome_options.add_argument('chromedriver_mac64/chromedriver')
-
-        # Instantiate the Chrome driver with options
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.implicitly_wait(10)
-        driver.maximize_window()
+        driver = new_driver(headless = False)
         driver.get(url)
-        currency = driver.find_element(By.XPATH,"//span[normalize-space()='Currency']")
-        currency.click()
-        usd = driver.find_element(By.XPATH,"//span[normalize-space()='US Dollar']")
-        usd.click()
-        ok_button = driver.find_element(By.XPATH,"//span[normalize-space()='OK']")
-        ok_button.click()
-
-        more_flights = driver.find_element(By.XPATH, "//div[@class='zISZ5c QB2Jof']") 
-        more_flights.click()
-
-        # Waiting and initial XPATH cleaning
-        # WebDriverWait(driver, timeout = 10).until(lambda d: len(get_flight_elements(d)) > 1000)
-        WebDriverWait(driver, timeout = 10).until(
-            EC.text_to_be_present_in_element(
-            (By.XPATH, "//span[@class='bEfgkb ']"), # Element Filtration
-            "Hide"# The Expected Text
-            )
-        )
-
-        # price_history = driver.find_element(By.XPATH, "//div[@class='GY6iob AdWm1c I3j9Le']") #"//div[@class='iy3L1b']"
-        # 
-        # price_history = WebDriverWait(driver, timeout = 20).until(EC.element_to_be_clickable(
-        #         (By.XPATH, "//div[@class='vx1PSc']")
-        #         )).click()  
-        # HISTORICAL PRICES
-        # # Wait for the button element to be clickable
-        # button = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.XPATH, "//button[@aria-label='View price history']")))
-        # button = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.CSS_SELECTOR, ".VfPpkd-LgbsSe"))) 
-        # # Click on the button
-        # button.click()
-
-        results = get_flight_elements(driver)
-        # price_history = find_flight_history_price(driver)
+        set_currency(driver)
+        results = expand_flight_results(driver)
         driver.quit()
 
     if isinstance(url, list):
-        # Instantiate driver
-        driver = webdriver.Chrome(options=chrome_options)
+        if not url:
+            return []
+
+        # Instantiate driver, unless sessions are borrowed from the pool
+        if pool is None:
+            driver = new_driver(headless = False)
+            driver.get(url[0])
+            set_currency(driver)
 
         # Begin getting results for each url
         results = []
         for u in tqdm(url, desc = 'Data Scrape'):
-            driver.get(u)
-
             try:
-                WebDriverWait(driver, timeout = 30).until(lambda d: len(get_flight_elements(d)) > 100)
-                results += [get_flight_elements(driver)]
-            except:
+                if pool is not None:
+                    with pool.session() as pooled_driver:
+                        results += [load_flight_results(pooled_driver, u, timeout = 30)]
+                else:
+                    results += [load_flight_results(driver, u, timeout = 30)]
+            except (TimeoutException, NoSuchElementException):
                 print('Timeout exception')
+                results += [[]] # keep results aligned with the dates
 
-        driver.quit()
+        if pool is None:
+            driver.quit()
 
     # return results, price_history
-    return results
\ No newline at end of file
+    return results
@@ -0,0 +1,80 @@
+''' WTP decomposition of the booking simulation: DTD, week of year and day of week components.
+
+    decompose_wtp adds the columns the simulation dashboard builds for one departure date, without
+    a Python call per group or per row:
+
+        WTP2       WTP plus the row's position within its group (flight and TF)
+        wtp_dtd    fare times one U(0.7, 0.75) draw per group
+        WOY_WTP    WTP_WOY.csv looked up by woy_departure
+        DOW_WTP    DOW_WTP looked up by dow_departure
+        final_wtp  wtp_dtd + WOY_WTP + DOW_WTP
+        final_fare final_wtp + bid_price
+        tf_fare    fare plus the TF_FARE_UPLIFT of its TF
+
+    Rows are grouped by flight, class and departure date (those of the columns a file has) and TF,
+    so every flight counts and draws over its own rows, also when several flights or dates are
+    decomposed at once. Rows with a missing key (a NaN TF) belong to no group and get NaN for WTP2
+    and wtp_dtd. The draws come from a Generator seeded with seed, one per group in sorted key
+    order, so the same rows and seed always give the same result. Components whose input columns
+    a file doesn't have are left out.
+'''
+import numpy as np
+import pandas as pd
+
+FLIGHT_KEYS = ['flight_number', 'class', 'departure_date']
+DTD_SHARE = (0.7, 0.75)
+DOW_WTP = {1: 40, 2: 20, 3: 20, 4: 20, 5: 45, 6: 70, 7: 50}
+TF_FARE_UPLIFT = {0: 50, 1: 70, 2: 90, 3: 100, 4: 120, 5: 150, 6: 170, 7: 190, 8: 190, 9: 200}
+
+
+def _lookup(values, table):
+    ''' table (a dict or Series) looked up for every value, NaN where it has no entry. '''
+    return pd.Series(values).map(table).to_numpy(dtype=float)
+
+
+def decompose_wtp(bookings, woy_wtp=None, seed=0, group_keys=None):
+    ''' bookings with the WTP components added (a new frame).
+
+        woy_wtp: the WTP_WOY.csv frame (WOY, WOY_WTP). group_keys: the columns the WTP2 count and a
+        DTD draw run over; by default the FLIGHT_KEYS the frame has, plus TF.
+    '''
+    df = bookings.copy()
+    keys = group_keys or [key for key in FLIGHT_KEYS if key in df] + ['TF']
+    # groupby leaves rows with a NaN key out (ngroup -1 or NaN, depending on the pandas version),
+    # so group only the complete rows and leave the rest NaN rather than index share with them
+    complete = df[keys].notna().all(axis=1).to_numpy()
+    groups = df[complete].groupby(keys, sort=True, observed=True)
+    position = np.full(len(df), np.nan)
+    position[complete] = groups.cumcount().to_numpy()
+    share = np.random.default_rng(seed).uniform(*DTD_SHARE, size=groups.ngroups)
+    draw = np.full(len(df), np.nan)
+    draw[complete] = share[groups.ngroup().to_numpy()]
+
+    df['simulation_day'] = 365 - df['days_to_departure']
+    df['WTP2'] = df['WTP'] + position
+    df['wtp_dtd'] = df['fare'] * draw
+    df['revenue'] = df['booking'] * df['fare']
+
+    components = ['wtp_dtd']
+    if woy_wtp is not None and 'woy_departure' in df:
+        df['WOY_WTP'] = _lookup(df['woy_departure'], woy_wtp.set_index('WOY')['WOY_WTP'])
+        components.append('WOY_WTP')
+    if 'dow_departure' in df:
+        df['DOW_WTP'] = _lookup(df['dow_departure'], DOW_WTP)
+        components.append('DOW_WTP')
+    df['final_wtp'] = df[components].sum(axis=1, min_count=len(components))
+    if 'bid_price' in df:
+        df['final_fare'] = df['final_wtp'] + df['bid_price']
+    df['tf_fare'] = df['fare'] + np.nan_to_num(_lookup(df['TF'], TF_FARE_UPLIFT))
+    return df
+
+
+def tf_components(decomposed):
+    ''' Mean DTD WTP and fare per TF, and the fare - WTP gap split 80/20 into WOY and DOW
+        (the dashboard's stacked bar chart).
+    '''
+    tf = decomposed.groupby('TF', as_index=False).agg(wtp_dtd=('wtp_dtd', 'mean'), fare=('fare', 'mean'))
+    tf['diff'] = tf['fare'] - tf['wtp_dtd']
+    tf['woy'] = np.round(tf['diff'] * 0.8, 2)
+    tf['dow'] = np.round(tf['diff'] * 0.2, 2)
+    return tf